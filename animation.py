@@ -0,0 +1,116 @@
+import math
+
+from sprite_cache import prepare_sprite
+
+# Declarative sprite animation. A Clip names the frames of one (state,
+# facing) pair; an AnimationTable expands every clip once, at load time, into
+# a per-tick list of (surface, y offset) with the scaling, mirroring and
+# bounce curve already applied. Entities only carry an Animator (state,
+# facing, tick), so any number of them can share one table and drawing a
+# frame is a single index lookup.
+#
+# Animators hold no surfaces and advance per simulation tick, so they live in
+# the World; tables are built by whoever draws it.
+
+# States
+IDLE = 0
+WALK = 1
+JUMP = 2  # in the air, going up
+FALL = 3  # in the air, coming down
+STATE_NAMES = ("idle", "walk", "jump", "fall")
+# Facings
+RIGHT = 0
+LEFT = 1
+
+# Walking bob: |sin(t)| * BOUNCE_HEIGHT px with t advancing BOUNCE_STEP per
+# tick, sampled over one period
+BOUNCE_HEIGHT = 3
+BOUNCE_STEP = 0.1
+BOUNCE_CURVE = tuple(round(abs(math.sin(i * BOUNCE_STEP)) * BOUNCE_HEIGHT)
+                     for i in range(round(math.pi / BOUNCE_STEP)))
+
+
+class Clip:
+    # frames are image names shown for ticks_per_frame ticks each, in a loop.
+    # flip mirrors them horizontally (a left-facing clip from right-facing
+    # art); bounce lifts the sprite by BOUNCE_CURVE while it plays.
+    def __init__(self, frames, ticks_per_frame=1, flip=False, bounce=False):
+        self.frames = tuple(frames)
+        self.ticks_per_frame = ticks_per_frame
+        self.flip = flip
+        self.bounce = bounce
+
+    def length(self):
+        # Ticks before the clip (frames and bounce together) repeats
+        frames = len(self.frames) * self.ticks_per_frame
+        if not self.bounce:
+            return frames
+        return frames * len(BOUNCE_CURVE) // math.gcd(frames, len(BOUNCE_CURVE))
+
+
+# The pig: a three-frame walk cycle to the right and single poses otherwise
+# (walking left keeps the sitting pose)
+PIG_WALK = ("piggy_right1", "piggy_right2", "piggy_right3")
+PIG_CLIPS = {
+    (IDLE, RIGHT): Clip(PIG_WALK[:1]),
+    (WALK, RIGHT): Clip(PIG_WALK, ticks_per_frame=7, bounce=True),
+    (JUMP, RIGHT): Clip(PIG_WALK[:1]),
+    (FALL, RIGHT): Clip(PIG_WALK[:1]),
+    (IDLE, LEFT): Clip(("piggy_sit_left",)),
+    (WALK, LEFT): Clip(("piggy_sit_left",), bounce=True),
+    (JUMP, LEFT): Clip(("piggy_jump_left",)),
+    (FALL, LEFT): Clip(("piggy_fly_left",)),
+}
+
+
+class AnimationTable:
+    # {(state, facing): [(surface, dy), ...]} with one entry per tick of each
+    # clip's period. Frames already at size (and not mirrored) are used as
+    # they are, so atlas sprites stay batchable.
+    def __init__(self, clips, images, size):
+        self.size = tuple(size)
+        self.frames = {}
+        self.surfaces = 0  # distinct surfaces made for the table
+        prepared = {}  # (name, flip) -> surface
+        for key, clip in clips.items():
+            surfaces = []
+            for name in clip.frames:
+                if (name, clip.flip) not in prepared:
+                    prepared[name, clip.flip] = self._prepare(images[name], clip.flip)
+                surfaces.append(prepared[name, clip.flip])
+            table = []
+            for tick in range(clip.length()):
+                dy = BOUNCE_CURVE[tick % len(BOUNCE_CURVE)] if clip.bounce else 0
+                table.append((surfaces[tick // clip.ticks_per_frame % len(surfaces)], dy))
+            self.frames[key] = table
+
+    def _prepare(self, image, flip):
+        if image.get_size() == self.size and not flip:
+            return image
+        self.surfaces += 1
+        return prepare_sprite(image, self.size, flip)
+
+    def frame(self, animator):
+        # (surface, dy) to draw for the animator's current tick
+        table = self.frames[animator.state, animator.facing]
+        return table[animator.tick % len(table)]
+
+
+class Animator:
+    # Per-entity animation state; phase offsets the clock so a crowd sharing
+    # a table doesn't move in lockstep
+    __slots__ = ("state", "facing", "tick")
+
+    def __init__(self, state=IDLE, facing=RIGHT, phase=0):
+        self.state = state
+        self.facing = facing
+        self.tick = phase
+
+    def update(self, state, facing):
+        # One tick in state; a new state or facing restarts its clip
+        if state != self.state or facing != self.facing:
+            self.state = state
+            self.facing = facing
+            self.tick = 0
+        else:
+            self.tick += 1
@@ -0,0 +1,245 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from atlas import Atlas, build_atlas
+
+# Asset manifest and packed bundle. Build the bundle after changing any PNG
+# (or the sizes below) with:
+#   python asset_pack.py
+# The game uses the bundle when it is up to date and falls back to decoding
+# the PNGs otherwise.
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+PACK_PATH = os.path.join(ASSET_DIR, "assets.pack")
+PACK_MAGIC = b"PIGPACK2"
+PACK_ALIGN = 64
+# Index key of the atlas sheet; every image with alpha is a region of it
+ATLAS_KEY = "__atlas__"
+
+# name -> (file, size the game draws it at or None to keep it, has alpha).
+# Sizes must match what piggy_game draws, otherwise the sprite cache has to
+# resample at runtime again.
+IMAGES = {
+    "piggy_fly_left": ("piggy_fly_left.png", (80, 80), True),
+    "piggy_jump_left": ("piggy_jump_left.png", (80, 80), True),
+    "piggy_sit_left": ("piggy_sit_left.png", (80, 80), True),
+    "piggy_right1": ("piggy_right1.png", (80, 80), True),
+    "piggy_right2": ("piggy_right2.png", (80, 80), True),
+    "piggy_right3": ("piggy_right3.png", (80, 80), True),
+    "bush": ("bush.png", (100, 60), True),
+    "flower1": ("flower1.png", (60, 80), True),
+    "rock": ("rock.png", (70, 50), True),
+    "bird": ("bird.png", (60, 60), True),
+    "flowers": ("flowers.png", (50, 50), True),
+    "background": ("background.png", (800, 600), False),
+}
+# Non-critical assets, loaded in the background after the first frame
+SOUNDS = {
+    "oink": "oink.mp3",
+    "fart": "fart.mp3",
+}
+MUSIC = "youcanhavesomeflowers.mp3"
+VIDEO = "flower1.mp4"
+
+LOADER_THREADS = 4
+
+
+def source_stamp(asset_dir, filename):
+    # Size and mtime of a source file; caches built from it (the pack, the
+    # PCM cache in audio.py) are rebuilt when this changes
+    st = os.stat(os.path.join(asset_dir, filename))
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _decode(asset_dir, filename, size):
+    # PNG decode + resample, the slow part the bundle exists to skip
+    image = pygame.image.load(os.path.join(asset_dir, filename))
+    if size is not None and image.get_size() != tuple(size):
+        if image.get_bitsize() >= 24:
+            image = pygame.transform.smoothscale(image, size)
+        else:
+            # smoothscale only handles 24/32-bit surfaces (e.g. not paletted PNGs)
+            image = pygame.transform.scale(image, size)
+    return image
+
+
+def _in_atlas(name):
+    return IMAGES[name][2]
+
+
+def build_pack(asset_dir=ASSET_DIR, pack_path=PACK_PATH):
+    index = {}
+    blobs = []
+    offset = 0
+
+    def add_blob(data):
+        nonlocal offset
+        start = offset
+        padded = len(data) + (-len(data)) % PACK_ALIGN
+        blobs.append(data + b"\0" * (padded - len(data)))
+        offset += padded
+        return start
+
+    decoded = {name: _decode(asset_dir, filename, size) for name, (filename, size, alpha) in IMAGES.items()}
+    atlas = build_atlas({name: image for name, image in decoded.items() if _in_atlas(name)})
+    data = pygame.image.tobytes(atlas.sheet, "RGBA")
+    index[ATLAS_KEY] = {
+        "offset": add_blob(data),
+        "length": len(data),
+        "size": list(atlas.sheet.get_size()),
+        "format": "RGBA",
+    }
+    for name, (filename, size, alpha) in IMAGES.items():
+        entry = {
+            "format": "RGBA" if alpha else "RGB",
+            "source": source_stamp(asset_dir, filename),
+            "target": list(size) if size else None,
+        }
+        if _in_atlas(name):
+            entry["atlas"] = list(atlas.regions[name])
+        else:
+            data = pygame.image.tobytes(decoded[name], entry["format"])
+            entry.update(offset=add_blob(data), length=len(data), size=list(decoded[name].get_size()))
+        index[name] = entry
+    header = json.dumps(index).encode("utf-8")
+    # Pixel data starts on an aligned offset after magic + header length + header
+    data_start = len(PACK_MAGIC) + 4 + len(header)
+    data_start += (-data_start) % PACK_ALIGN
+    tmp_path = pack_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(b"\0" * (data_start - f.tell()))
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, pack_path)
+    return index
+
+
+class AssetPack:
+    # Memory-maps a bundle written by build_pack; images come straight out of
+    # the mapped pixel data without PNG decoding or resampling.
+    def __init__(self, pack_path=PACK_PATH):
+        with open(pack_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(PACK_MAGIC)] != PACK_MAGIC:
+            raise ValueError(f"{pack_path} is not an asset pack or was built by an older version")
+        (header_len,) = struct.unpack_from("<I", self._mm, len(PACK_MAGIC))
+        header_start = len(PACK_MAGIC) + 4
+        self.index = json.loads(self._mm[header_start:header_start + header_len].decode("utf-8"))
+        data_start = header_start + header_len
+        self._data_start = data_start + (-data_start) % PACK_ALIGN
+        self._view = memoryview(self._mm)
+
+    def is_fresh(self, asset_dir=ASSET_DIR):
+        # Stale if the manifest or any source PNG changed since the build
+        if set(self.index) != set(IMAGES) | {ATLAS_KEY}:
+            return False
+        for name, (filename, size, alpha) in IMAGES.items():
+            entry = self.index[name]
+            if entry["target"] != (list(size) if size else None):
+                return False
+            if entry["format"] != ("RGBA" if alpha else "RGB"):
+                return False
+            if entry["source"] != source_stamp(asset_dir, filename):
+                return False
+            if ("atlas" in entry) != _in_atlas(name):
+                return False
+        return True
+
+    def atlas(self):
+        regions = {name: entry["atlas"] for name, entry in self.index.items() if "atlas" in entry}
+        return Atlas(self.image(ATLAS_KEY), regions)
+
+    def image(self, name):
+        entry = self.index[name]
+        start = self._data_start + entry["offset"]
+        pixels = self._view[start:start + entry["length"]]
+        return pygame.image.frombuffer(pixels, tuple(entry["size"]), entry["format"])
+
+
+def _open_pack(pack_path):
+    if not os.path.exists(pack_path):
+        return None
+    try:
+        pack = AssetPack(pack_path)
+        if pack.is_fresh():
+            return pack
+        print("Warning: asset pack is out of date, run 'python asset_pack.py' to rebuild it")
+    except Exception as e:
+        print(f"Warning: could not read asset pack: {e}")
+    return None
+
+
+def load_images(asset_dir=ASSET_DIR, pack_path=PACK_PATH):
+    # Returns ({name: display-format surface}, Atlas) for every image in the
+    # manifest; images with alpha are subsurfaces of the atlas sheet
+    pack = _open_pack(pack_path)
+    if pack is not None:
+        atlas = pack.atlas()
+        raw = {name: pack.image(name) for name in IMAGES if not _in_atlas(name)}
+    else:
+        # No usable bundle: decode the PNGs in parallel (decoding releases the GIL)
+        with ThreadPoolExecutor(max_workers=LOADER_THREADS) as pool:
+            futures = {name: pool.submit(_decode, asset_dir, filename, size)
+                       for name, (filename, size, alpha) in IMAGES.items()}
+            raw = {name: future.result() for name, future in futures.items()}
+        atlas = build_atlas({name: raw.pop(name) for name in IMAGES if _in_atlas(name)})
+    # convert() copies into the display format, so nothing keeps the mapping.
+    # Without a display surface (texture renderer) the raw surfaces are kept,
+    # they only get uploaded once as textures.
+    if pygame.display.get_surface() is None:
+        return {**atlas.images, **raw}, atlas
+    atlas = atlas.convert()
+    images = dict(atlas.images)
+    for name, image in raw.items():
+        images[name] = image.convert_alpha() if IMAGES[name][2] else image.convert()
+    return images, atlas
+
+
+class LazyAssets:
+    # Loads non-critical assets (sounds, music) on a small thread pool.
+    # get() never blocks: it returns None until the asset is ready.
+    def __init__(self, workers=LOADER_THREADS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asset-loader")
+        self._futures = {}
+        self._ready = {}
+
+    def submit(self, name, fn, *args):
+        self._futures[name] = self._pool.submit(fn, *args)
+
+    def get(self, name):
+        if name in self._ready:
+            return self._ready[name]
+        future = self._futures.get(name)
+        if future is None or not future.done():
+            return None
+        try:
+            value = future.result()
+        except Exception as e:
+            print(f"Warning: could not load {name}: {e}")
+            value = None
+        self._ready[name] = value
+        return value
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    index = build_pack()
+    total = sum(entry.get("length", 0) for entry in index.values())
+    sheet = index[ATLAS_KEY]["size"]
+    print(f"Wrote {PACK_PATH}: {len(index) - 1} images ({sheet[0]}x{sheet[1]} atlas), {total / 1024:.0f} KiB of pixel data")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
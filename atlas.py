@@ -0,0 +1,85 @@
+import pygame
+
+# Sprite atlas: all the small alpha sprites live in one sheet, and a frame's
+# sprites are collected into a SpriteBatch and drawn with a single
+# Surface.blits call per layer instead of one blit call per sprite.
+
+ATLAS_MAX_WIDTH = 1024
+# Transparent gap around each region so scaled or filtered draws don't bleed
+ATLAS_PADDING = 2
+
+
+def pack_regions(sizes, max_width=ATLAS_MAX_WIDTH, padding=ATLAS_PADDING):
+    # Shelf packing, tallest first. sizes is {name: (w, h)}; returns
+    # ({name: Rect}, (sheet width, sheet height)).
+    regions = {}
+    x = y = shelf_height = sheet_width = 0
+    for name, (w, h) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0], item[0])):
+        if w + padding > max_width:
+            raise ValueError(f"{name} is wider than the atlas ({w} > {max_width - padding})")
+        if x + w + padding > max_width:
+            # Start a new shelf under the current one
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        regions[name] = pygame.Rect(x + padding, y + padding, w, h)
+        x += w + padding
+        shelf_height = max(shelf_height, h + padding)
+        sheet_width = max(sheet_width, x + padding)
+    return regions, (sheet_width, y + shelf_height + padding)
+
+
+class Atlas:
+    # One sheet surface plus the region of each sprite in it. images[name]
+    # are subsurfaces, so they share the sheet's pixels.
+    def __init__(self, sheet, regions):
+        self.sheet = sheet
+        self.regions = {name: pygame.Rect(rect) for name, rect in regions.items()}
+        self.images = {name: sheet.subsurface(rect) for name, rect in self.regions.items()}
+        self._areas = {id(image): self.regions[name] for name, image in self.images.items()}
+
+    def area(self, image):
+        # Region of one of our subsurfaces in the sheet, None for other surfaces
+        return self._areas.get(id(image))
+
+    def convert(self):
+        # Same atlas on a display-format copy of the sheet
+        return Atlas(self.sheet.convert_alpha(), self.regions)
+
+
+def build_atlas(images):
+    # Packs {name: surface} into a new atlas
+    regions, size = pack_regions({name: image.get_size() for name, image in images.items()})
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    for name, image in images.items():
+        # Onto a fully transparent sheet this copies the pixels, alpha included
+        sheet.blit(image, regions[name])
+    return Atlas(sheet, regions)
+
+
+class SpriteBatch:
+    # Collects one layer's blits as (sheet, dest, area) tuples and draws them
+    # with one Surface.blits call. Surfaces that aren't in the atlas (video
+    # frames, overlays) can be added too and are blitted whole.
+    def __init__(self, atlas):
+        self.atlas = atlas
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, image, dest):
+        area = self.atlas.area(image)
+        if area is None:
+            self.items.append((image, dest))
+        else:
+            self.items.append((self.atlas.sheet, dest, area))
+
+    def clear(self):
+        self.items = []
+
+    def draw(self, surface, doreturn=False):
+        # Returns the changed rects when doreturn is set
+        rects = surface.blits(self.items, doreturn)
+        self.items = []
+        return rects
@@ -0,0 +1,179 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import pygame
+
+import asset_pack
+
+# Decoded PCM is cached here so MP3s are only decoded once per mixer format
+PCM_DIR = os.path.join(asset_pack.ASSET_DIR, "pcm")
+PCM_MAGIC = b"PIGPCM01"
+
+# name -> (priority, minimum ms between plays, max simultaneous voices).
+# Higher priorities may steal channels from lower ones when the pool is full.
+EFFECTS = {
+    "oink": (1, 500, 1),
+    "fart": (2, 80, 2),
+}
+MUSIC = "music"
+# Reserved channels: one for music, the rest are the effect pool
+MUSIC_CHANNEL = 0
+EFFECT_CHANNELS = 6
+
+
+def decode_pcm(name, filename, asset_dir=asset_pack.ASSET_DIR, cache_dir=PCM_DIR):
+    # Returns a Sound built from raw PCM in the mixer's output format. The
+    # first call decodes the MP3 and writes the cache; later runs only read it.
+    source = os.path.join(asset_dir, filename)
+    key = {"format": list(pygame.mixer.get_init()), "source": asset_pack.source_stamp(asset_dir, filename)}
+    cache_path = os.path.join(cache_dir, name + ".pcm")
+    try:
+        with open(cache_path, "rb") as f:
+            if f.read(len(PCM_MAGIC)) == PCM_MAGIC:
+                (header_len,) = struct.unpack("<I", f.read(4))
+                if json.loads(f.read(header_len).decode("utf-8")) == key:
+                    return pygame.mixer.Sound(buffer=f.read())
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: could not read PCM cache for {name}: {e}")
+    sound = pygame.mixer.Sound(source)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        header = json.dumps(key).encode("utf-8")
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(PCM_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(sound.get_raw())
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: could not write PCM cache for {name}: {e}")
+    return sound
+
+
+class _Voice:
+    __slots__ = ("channel", "name", "priority", "started")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.name = None
+        self.priority = 0
+        self.started = 0.0
+
+
+class AudioManager:
+    # Sound effects and music on a fixed pool of reserved mixer channels.
+    # play() only queues a request; end_frame() hands the frame's requests to
+    # a worker thread as one batch, which merges duplicates, applies rate
+    # limits and picks channels (stealing the oldest lower-priority voice if
+    # the pool is full), so the game loop never waits on the mixer.
+    def __init__(self, assets, effects=EFFECTS, channels=EFFECT_CHANNELS, enabled=True):
+        self.assets = assets
+        self.effects = effects
+        self.enabled = enabled and pygame.mixer.get_init() is not None
+        self.stats = {"played": 0, "merged": 0, "limited": 0, "stolen": 0, "dropped": 0}
+        self._pending = []
+        self._music_started = False
+        self._thread = None
+        if not self.enabled:
+            return
+        for name, filename in asset_pack.SOUNDS.items():
+            assets.submit(name, decode_pcm, name, filename)
+        assets.submit(MUSIC, decode_pcm, MUSIC, asset_pack.MUSIC)
+        # Reserved channels are never handed out by Sound.play(), so nothing
+        # else can take them from under the pool
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels + 1))
+        pygame.mixer.set_reserved(channels + 1)
+        self.music_channel = pygame.mixer.Channel(MUSIC_CHANNEL)
+        self.voices = [_Voice(pygame.mixer.Channel(MUSIC_CHANNEL + 1 + i)) for i in range(channels)]
+        self._last_played = {}
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._worker, name="audio", daemon=True)
+        self._thread.start()
+
+    def play(self, name):
+        if self.enabled:
+            self._pending.append(name)
+
+    def end_frame(self):
+        # Resolve this frame's requests to loaded sounds and pass them on
+        if not self.enabled:
+            return
+        batch = []
+        if not self._music_started:
+            music = self.assets.get(MUSIC)
+            if music is not None:
+                batch.append((MUSIC, music))
+                self._music_started = True
+        for name in self._pending:
+            sound = self.assets.get(name)
+            # Sounds still loading are skipped, not delayed
+            if sound is not None:
+                batch.append((name, sound))
+        self._pending.clear()
+        if batch:
+            self._queue.put(batch)
+
+    def _worker(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            try:
+                self._apply(batch)
+            except Exception as e:
+                print(f"Warning: audio error: {e}")
+
+    def _apply(self, batch):
+        now = time.monotonic() * 1000.0
+        # The same sound triggered several times in one frame plays once
+        sounds = {}
+        for name, sound in batch:
+            if name in sounds:
+                self.stats["merged"] += 1
+            sounds[name] = sound
+        if MUSIC in sounds:
+            self.music_channel.play(sounds.pop(MUSIC), loops=-1)
+        for name in sorted(sounds, key=lambda n: -self.effects[n][0]):
+            priority, interval, max_voices = self.effects[name]
+            if now - self._last_played.get(name, -interval) < interval:
+                self.stats["limited"] += 1
+                continue
+            voice = self._allocate(name, priority, max_voices)
+            if voice is None:
+                self.stats["dropped"] += 1
+                continue
+            voice.channel.play(sounds[name])
+            voice.name = name
+            voice.priority = priority
+            voice.started = now
+            self._last_played[name] = now
+            self.stats["played"] += 1
+
+    def _allocate(self, name, priority, max_voices):
+        busy = [voice for voice in self.voices if voice.channel.get_busy()]
+        same = [voice for voice in busy if voice.name == name]
+        if len(same) >= max_voices:
+            # Restart the oldest copy instead of stacking another one
+            return min(same, key=lambda voice: voice.started)
+        for voice in self.voices:
+            if voice not in busy:
+                return voice
+        candidates = [voice for voice in busy if voice.priority <= priority]
+        if not candidates:
+            return None
+        self.stats["stolen"] += 1
+        return min(candidates, key=lambda voice: (voice.priority, voice.started))
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=1.0)
+            self._thread = None
+            pygame.mixer.stop()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import headless
+
+# Runs many headless episodes across a process pool and reports simulation
+# throughput, e.g.
+#   python batch_runner.py --episodes 64 --ticks 3600 --workers 8
+#   python batch_runner.py --script "R:600 RJ:10 L:120" --episodes 16
+
+
+def _run(job):
+    seed, inputs, render = job
+    return headless.run_episode(inputs, seed=seed, render=render)
+
+
+def make_jobs(args):
+    jobs = []
+    for episode in range(args.episodes):
+        seed = args.seed + episode
+        if args.script:
+            inputs = headless.parse_script(args.script)
+        else:
+            inputs = headless.random_inputs(args.ticks, seed=seed)
+        jobs.append((seed, inputs, args.render))
+    return jobs
+
+
+def run_batch(jobs, workers=None):
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_run(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run, jobs))
+    return results, time.perf_counter() - started
+
+
+def report(results, wall_seconds):
+    ticks = sum(r["ticks"] for r in results)
+    sim_seconds = sum(r["seconds"] for r in results)
+    rates = sorted(r["ticks_per_second"] for r in results)
+    print(f"episodes:              {len(results)}")
+    print(f"total ticks:           {ticks}")
+    print(f"wall time:             {wall_seconds:.2f} s")
+    print(f"aggregate ticks/s:     {ticks / wall_seconds:.0f}")
+    if sim_seconds > 0:
+        print(f"per-process ticks/s:   {ticks / sim_seconds:.0f} (stepping only)")
+    print(f"episode ticks/s:       min {rates[0]:.0f}  median {rates[len(rates) // 2]:.0f}  max {rates[-1]:.0f}")
+    print(f"avg setup per episode: {sum(r['setup_seconds'] for r in results) / len(results):.2f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless piggy simulation batch runner")
+    parser.add_argument("--episodes", type=int, default=16)
+    parser.add_argument("--ticks", type=int, default=3600, help="ticks per episode for random input")
+    parser.add_argument("--script", help='input script instead of random input, e.g. "R:120 RJ:5 .:30"')
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first episode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes, 1 runs in-process")
+    parser.add_argument("--render", action="store_true", help="also render every tick to the dummy display")
+    args = parser.parse_args(argv)
+    results, wall_seconds = run_batch(make_jobs(args), workers=args.workers)
+    report(results, wall_seconds)
+
+
+if __name__ == "__main__":
+    main()
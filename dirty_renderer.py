@@ -0,0 +1,61 @@
+import pygame
+
+
+class DirtyRectRenderer:
+    # Opt-in renderer that only pushes the parts of the screen that changed.
+    # Everything that doesn't move (background, ground, obstacles, sprites) is
+    # rendered once into a static layer; each frame the areas covered by last
+    # frame's dynamic sprites are restored from it and only those rects, plus
+    # this frame's, go to pygame.display.update().
+    def __init__(self, screen):
+        self.screen = screen
+        self.static_layer = pygame.Surface(screen.get_size()).convert()
+        self._static_key = None  # key the static layer was drawn for
+        self._last_key = None  # key of the previous frame
+        self._full_redraw = True
+        self._prev_rects = []
+        self._rects = []
+
+    def invalidate(self):
+        self._static_key = None
+
+    def begin_frame(self, static_key, draw_static):
+        # draw_static(surface) renders the static layer; it is only called when
+        # static_key changes (camera moved, item collected...). While the key
+        # keeps changing every frame (scrolling) the layer would be thrown away
+        # right after being built, so the static content is drawn straight to
+        # the screen instead, like the full-redraw path.
+        changed = static_key != self._last_key
+        self._last_key = static_key
+        if static_key == self._static_key:
+            if self._full_redraw:
+                self.screen.blit(self.static_layer, (0, 0))
+            else:
+                for rect in self._prev_rects:
+                    self.screen.blit(self.static_layer, rect, rect)
+        elif changed:
+            draw_static(self.screen)
+            self._full_redraw = True
+        else:
+            # Settled on a new key: build the layer once and restore from it
+            draw_static(self.static_layer)
+            self._static_key = static_key
+            self.screen.blit(self.static_layer, (0, 0))
+            self._full_redraw = True
+
+    def blits(self, blit_sequence):
+        # Blits a Surface.blits sequence to the screen and remembers the
+        # changed rects for end_frame()
+        for rect in self.screen.blits(blit_sequence):
+            if rect.width and rect.height:
+                self._rects.append(rect)
+
+    def end_frame(self):
+        if self._full_redraw:
+            pygame.display.flip()
+            self._full_redraw = False
+        else:
+            # Last frame's rects must be pushed too, to erase what moved away
+            pygame.display.update(self._prev_rects + self._rects)
+        self._prev_rects = self._rects
+        self._rects = []
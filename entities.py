@@ -0,0 +1,149 @@
+import numpy as np
+
+# Entity flags
+SOLID = 1      # blocks movement and can be stood on, drawn as a box
+PICKUP = 2     # collected when the pig touches it
+COLLECTED = 4
+
+NO_SPRITE = -1
+INITIAL_CAPACITY = 256
+
+
+class EntityStore:
+    # Every obstacle and collectible in the loaded part of the world, stored
+    # as parallel NumPy arrays (position, size, flags, sprite id) indexed by
+    # entity id. Collision and culling queries are single vectorized passes
+    # over the arrays instead of Python loops over rects and dicts, and only
+    # over the entities whose x-span can reach the query: live ids are kept
+    # sorted by left edge and the candidates found with a binary search.
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.x = np.zeros(capacity, np.int32)
+        self.y = np.zeros(capacity, np.int32)
+        self.w = np.zeros(capacity, np.int32)
+        self.h = np.zeros(capacity, np.int32)
+        # Right/bottom edges kept alongside so queries don't recompute x + w
+        self.right = np.zeros(capacity, np.int32)
+        self.bottom = np.zeros(capacity, np.int32)
+        self.flags = np.zeros(capacity, np.uint8)
+        self.sprite = np.full(capacity, NO_SPRITE, np.int16)
+        self.alive = np.zeros(capacity, bool)
+        # Ids below this have been used; queries only look at [:self.size]
+        self.size = 0
+        self._free = []
+        # Sprite table shared by all entities: id -> surface
+        self.sprites = []
+        self.sprite_ids = {}
+        # flags -> active mask, dropped whenever an entity changes
+        self._masks = {}
+        # Live ids sorted by x, their x values and the widest width; rebuilt
+        # lazily after add/remove (collecting doesn't move anything)
+        self._order = None
+        self._xs = None
+        self._max_w = 0
+
+    def register_sprite(self, name, image):
+        sprite_id = self.sprite_ids.get(name)
+        if sprite_id is None:
+            sprite_id = self.sprite_ids[name] = len(self.sprites)
+            self.sprites.append(image)
+        else:
+            self.sprites[sprite_id] = image
+        return sprite_id
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in ("x", "y", "w", "h", "right", "bottom", "flags", "alive"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        sprite = np.full(capacity, NO_SPRITE, np.int16)
+        sprite[:len(self.sprite)] = self.sprite
+        self.sprite = sprite
+
+    def add(self, rect, flags, sprite=NO_SPRITE):
+        if self._free:
+            eid = self._free.pop()
+        else:
+            if self.size == len(self.x):
+                self._grow()
+            eid = self.size
+            self.size += 1
+        x, y, w, h = rect
+        self.x[eid], self.y[eid], self.w[eid], self.h[eid] = x, y, w, h
+        self.right[eid] = x + w
+        self.bottom[eid] = y + h
+        self.flags[eid] = flags
+        self.sprite[eid] = sprite
+        self.alive[eid] = True
+        self._masks.clear()
+        self._order = None
+        return eid
+
+    def remove(self, eid):
+        if self.alive[eid]:
+            self.alive[eid] = False
+            self.flags[eid] = 0
+            self._free.append(eid)
+            self._masks.clear()
+            self._order = None
+
+    def __len__(self):
+        return int(np.count_nonzero(self.alive[:self.size]))
+
+    def is_collected(self, eid):
+        return bool(self.flags[eid] & COLLECTED)
+
+    def collect(self, eids):
+        self.flags[eids] |= COLLECTED
+        self._masks.clear()
+
+    def _active(self, flags):
+        # Alive, carrying any of flags and not collected yet
+        mask = self._masks.get(flags)
+        if mask is None:
+            n = self.size
+            f = self.flags[:n]
+            mask = self._masks[flags] = self.alive[:n] & ((f & flags) != 0) & ((f & COLLECTED) == 0)
+        return mask
+
+    def _span(self, left, right):
+        # Live ids that may overlap the x-span [left, right): x < right and
+        # x > left - widest width. Callers still check right > left.
+        if self._order is None:
+            ids = np.flatnonzero(self.alive[:self.size])
+            self._order = ids[np.argsort(self.x[ids], kind="stable")]
+            # int64 so searchsorted with Python ints doesn't cast the array per query
+            self._xs = self.x[self._order].astype(np.int64)
+            self._max_w = int(self.w[ids].max()) if ids.size else 0
+        xs = self._xs
+        return self._order[np.searchsorted(xs, left - self._max_w, "right"):np.searchsorted(xs, right, "left")]
+
+    def overlapping(self, rect, flags):
+        # Ids whose box overlaps rect (same edge rules as Rect.colliderect),
+        # in id order
+        left, top, width, height = rect
+        ids = self._span(left, left + width)
+        hit = (self._active(flags)[ids] & (self.right[ids] > left)
+               & (self.y[ids] < top + height) & (self.bottom[ids] > top))
+        return np.sort(ids[hit])
+
+    def any_overlap(self, rect, flags):
+        return self.overlapping(rect, flags).size > 0
+
+    def in_view(self, left, right, flags):
+        # Culling: ids horizontally inside [left, right), in id order
+        ids = self._span(left, right)
+        return np.sort(ids[self._active(flags)[ids] & (self.right[ids] > left)])
+
+    def highest_top(self, left, right, min_top, max_top=None, flags=SOLID):
+        # Smallest top in [min_top, max_top] among boxes overlapping the x-span
+        # [left, right), or None
+        ids = self._span(left, right)
+        top = self.y[ids]
+        hit = self._active(flags)[ids] & (self.right[ids] > left) & (top >= min_top)
+        if max_top is not None:
+            hit &= top <= max_top
+        if not hit.any():
+            return None
+        return int(top[hit].min())
@@ -0,0 +1,44 @@
+import random
+
+import pygame
+
+# Input for one simulation tick is a bitmask of these
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+
+SCRIPT_KEYS = {"L": LEFT, "R": RIGHT, "J": JUMP}
+
+
+def keys_to_mask(keys):
+    mask = 0
+    if keys[pygame.K_LEFT]:
+        mask |= LEFT
+    if keys[pygame.K_RIGHT]:
+        mask |= RIGHT
+    if keys[pygame.K_SPACE]:
+        mask |= JUMP
+    return mask
+
+
+def parse_script(script):
+    # "R:120 RJ:5 .:30" -> 120 ticks right, 5 ticks right+jump, 30 idle ticks
+    masks = []
+    for token in script.split():
+        keys, _, count = token.partition(":")
+        mask = 0
+        for key in keys.upper():
+            if key != ".":
+                mask |= SCRIPT_KEYS[key]
+        masks.extend([mask] * int(count or 1))
+    return masks
+
+
+def random_inputs(ticks, seed=None):
+    # Mostly walking right with the odd jump or turn, held for a while each
+    rng = random.Random(seed)
+    masks = []
+    while len(masks) < ticks:
+        mask = rng.choice((RIGHT, RIGHT, RIGHT | JUMP, LEFT, LEFT | JUMP, 0))
+        masks.extend([mask] * rng.randint(5, 60))
+    return masks[:ticks]
@@ -0,0 +1,79 @@
+import os
+import time
+
+# SDL picks its drivers at pygame.init(), which PiggyGame runs when it is
+# created, so the dummy drivers have to be set before any game exists.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import piggy_game  # noqa: E402
+from world import World  # noqa: E402
+from profiler import FrameProfiler  # noqa: E402
+from game_input import LEFT, RIGHT, JUMP, parse_script, random_inputs  # noqa: E402,F401
+
+
+class HeadlessGame:
+    # Steps a World as fast as possible from a sequence of input masks. With
+    # render=True a PiggyGame draws every tick to the dummy display (no audio,
+    # video decoding or clock throttling); otherwise there is no display at all.
+    def __init__(self, seed=None, render=False, renderer="surface", profiler=None):
+        self.profiler = profiler or FrameProfiler()
+        self.render = render
+        if render:
+            self.game = piggy_game.PiggyGame(headless=True, seed=seed, renderer=renderer, profiler=self.profiler)
+            self.world = self.game.world
+        else:
+            self.game = None
+            self.world = World(seed, profiler=self.profiler, record_events=False)
+        self.ticks = 0
+
+    def step(self, mask):
+        profiler = self.profiler
+        profiler.begin_frame()
+        self.ticks += 1
+        game = self.game
+        if game is None:
+            self.world.step(mask)
+        else:
+            game.step(mask)
+            game.interpolate(1.0)
+            game.update_camera()
+            game.render_full()
+            with profiler.stage("flip"):
+                game.present()
+        profiler.end_frame()
+
+    def run(self, inputs):
+        for mask in inputs:
+            self.step(mask)
+        return self.ticks
+
+    def collected(self):
+        return self.world.collected()
+
+    def close(self):
+        if self.game is not None:
+            self.game.flower1_video.stop()
+
+
+def run_episode(inputs, seed=None, render=False):
+    # Returns a summary dict; ticks_per_second only covers stepping, not setup
+    started = time.perf_counter()
+    episode = HeadlessGame(seed=seed, render=render)
+    setup = time.perf_counter() - started
+    started = time.perf_counter()
+    ticks = episode.run(inputs)
+    elapsed = time.perf_counter() - started
+    world = episode.world
+    result = {
+        "seed": world.seed,
+        "ticks": ticks,
+        "setup_seconds": setup,
+        "seconds": elapsed,
+        "ticks_per_second": ticks / elapsed if elapsed > 0 else float("inf"),
+        "pig_x": world.pig_x,
+        "pig_y": world.pig_y,
+        "collected": episode.collected(),
+    }
+    episode.close()
+    return result
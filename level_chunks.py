@@ -0,0 +1,75 @@
+# Chunked level streaming for the scrolling world. The world is split into
+# CHUNK_WIDTH wide columns that are built lazily as the camera approaches and
+# evicted again once they are out of range, so only nearby chunks take part in
+# drawing and collision tests.
+from entities import SOLID, PICKUP, NO_SPRITE
+
+# One screen per chunk
+CHUNK_WIDTH = 800
+
+
+class Chunk:
+    def __init__(self, index, obstacles, pickups, chunk_width=CHUNK_WIDTH):
+        self.index = index
+        self.left = index * chunk_width
+        self.right = self.left + chunk_width
+        self.obstacles = obstacles  # list of pygame.Rect (solid, drawn as boxes)
+        self.pickups = pickups      # list of (pygame.Rect, sprite id)
+        self.entity_ids = []        # pickups first, in order, then obstacles
+
+
+class ChunkStreamer:
+    # build_chunk(index) must return a Chunk and should be deterministic for a
+    # given index, since evicted chunks are rebuilt when the pig walks back.
+    def __init__(self, build_chunk, entities, chunk_width=CHUNK_WIDTH, load_ahead=1, keep_behind=1):
+        self.build_chunk = build_chunk
+        self.entities = entities
+        self.chunk_width = chunk_width
+        self.load_ahead = load_ahead
+        self.keep_behind = keep_behind
+        self.chunks = {}  # index -> Chunk
+        # Pickup positions collected in evicted chunks, reapplied on rebuild
+        self._collected = {}
+
+    def chunk_range(self, view_left, view_width):
+        first = int(view_left // self.chunk_width)
+        last = int((view_left + view_width - 1) // self.chunk_width)
+        return first, last
+
+    def update(self, view_left, view_width):
+        first, last = self.chunk_range(view_left, view_width)
+        first = max(0, first - self.keep_behind)
+        last = last + self.load_ahead
+        for index in [i for i in self.chunks if i < first or i > last]:
+            self._evict(index)
+        for index in range(first, last + 1):
+            if index not in self.chunks:
+                self._load(index)
+
+    def _collected_positions(self, chunk):
+        return [pos for pos in range(len(chunk.pickups)) if self.entities.is_collected(chunk.entity_ids[pos])]
+
+    def collected_count(self):
+        loaded = sum(len(self._collected_positions(chunk)) for chunk in self.chunks.values())
+        return loaded + sum(len(positions) for positions in self._collected.values())
+
+    def _load(self, index):
+        chunk = self.build_chunk(index)
+        entities = self.entities
+        for rect, sprite_id in chunk.pickups:
+            chunk.entity_ids.append(entities.add(rect, PICKUP, sprite_id))
+        for rect in chunk.obstacles:
+            chunk.entity_ids.append(entities.add(rect, SOLID, NO_SPRITE))
+        collected = self._collected.pop(index, ())
+        if collected:
+            entities.collect([chunk.entity_ids[pos] for pos in collected])
+        self.chunks[index] = chunk
+        return chunk
+
+    def _evict(self, index):
+        chunk = self.chunks.pop(index)
+        collected = self._collected_positions(chunk)
+        if collected:
+            self._collected[index] = collected
+        for eid in chunk.entity_ids:
+            self.entities.remove(eid)
@@ -0,0 +1,138 @@
+import argparse
+import random
+import sys
+import time
+
+import pygame
+
+from level_chunks import CHUNK_WIDTH
+
+# Procedural level layout. Ground sprites are placed by tracking the free
+# x-intervals of the ground row and sampling a position uniformly from the
+# ones that still fit, so every placement costs one pass over the free list
+# (no rejection sampling) and a full row is detected immediately instead of
+# re-rolling forever.
+
+GROUND_Y = 500  # y-coordinate of the ground (world.py uses this one too)
+# Nothing is placed closer than this to a chunk edge
+EDGE_MARGIN = 50
+
+# Sprite kind -> (width, height)
+PICKUP_SIZES = {
+    "flowers": (50, 50),
+    "bush": (100, 60),
+    "flower1": (60, 80),
+    "rock": (70, 50),
+    "bird": (60, 60),
+}
+# Ground pickups per generated chunk, in placement order
+CHUNK_PICKUPS = ("flowers", "flowers", "bush", "flower1")
+
+
+class FreeIntervals:
+    # Free parts of [left, right) as sorted, disjoint [start, end) pairs
+    def __init__(self, left, right):
+        self._free = [(left, right)] if right > left else []
+
+    def __len__(self):
+        return len(self._free)
+
+    def reserve(self, start, end):
+        # Mark [start, end) as taken
+        free = []
+        for a, b in self._free:
+            if b <= start or a >= end:
+                free.append((a, b))
+                continue
+            if a < start:
+                free.append((a, start))
+            if b > end:
+                free.append((end, b))
+        self._free = free
+
+    def sample(self, width, rng):
+        # Left edge drawn uniformly from every position where width still
+        # fits, or None if no gap is wide enough
+        fits = [(start, end - start - width + 1) for start, end in self._free if end - start >= width]
+        if not fits:
+            return None
+        pick = rng.randrange(sum(count for _, count in fits))
+        for start, count in fits:
+            if pick < count:
+                return start + pick
+            pick -= count
+        return None
+
+
+def place_row(rng, row, widths, gap=0):
+    # Places items of the given widths in row (a FreeIntervals), biggest
+    # first so small items can't fragment the row for them. Returns the left
+    # edge per item, in the order given, with None for items that didn't fit;
+    # an item that doesn't fit is known after one pass over the free list.
+    lefts = [None] * len(widths)
+    for i in sorted(range(len(widths)), key=lambda i: -widths[i]):
+        x = row.sample(widths[i], rng)
+        if x is None:
+            continue
+        row.reserve(x - gap, x + widths[i] + gap)
+        lefts[i] = x
+    return lefts
+
+
+def place_on_top(obs, kind, clearance=0):
+    # Rect for a pickup centered on top of obstacle obs, clearance px above it
+    width, height = PICKUP_SIZES[kind]
+    return pygame.Rect(obs.centerx - width // 2, obs.top - clearance - height, width, height)
+
+
+class LevelGenerator:
+    # Deterministic chunk layouts: chunk(index) always returns the same
+    # obstacles and pickups for a given seed, so evicted chunks rebuild
+    # identically.
+    def __init__(self, seed, ground_y=GROUND_Y, chunk_width=CHUNK_WIDTH, margin=EDGE_MARGIN):
+        self.seed = seed
+        self.ground_y = ground_y
+        self.chunk_width = chunk_width
+        self.margin = margin
+
+    def chunk(self, index):
+        # ([obstacle Rect], [(pickup Rect, kind)]) for chunk index
+        rng = random.Random(self.seed * 1000003 + index)
+        left = index * self.chunk_width
+        row = FreeIntervals(left + self.margin, left + self.chunk_width - self.margin)
+        sizes = []
+        for _ in range(rng.randint(2, 3)):
+            sizes.append((rng.randint(80, 120), rng.randint(30, 60)))
+        sizes += [PICKUP_SIZES[kind] for kind in CHUNK_PICKUPS]
+        lefts = place_row(rng, row, [width for width, height in sizes])
+        rects = [None if x is None else pygame.Rect(x, self.ground_y - height, width, height)
+                 for x, (width, height) in zip(lefts, sizes)]
+        count = len(sizes) - len(CHUNK_PICKUPS)
+        obstacles = [rect for rect in rects[:count] if rect is not None]
+        pickups = [(rect, kind) for rect, kind in zip(rects[count:], CHUNK_PICKUPS) if rect is not None]
+        if obstacles:
+            # Rock on top of an obstacle and a bird hovering over another one
+            pickups.append((place_on_top(rng.choice(obstacles), "rock"), "rock"))
+            pickups.append((place_on_top(rng.choice(obstacles), "bird", 30), "bird"))
+        return obstacles, pickups
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time level generation")
+    parser.add_argument("--items", type=int, default=10000, help="obstacles + pickups to generate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generator = LevelGenerator(args.seed)
+    started = time.perf_counter()
+    items = chunks = 0
+    while items < args.items:
+        obstacles, pickups = generator.chunk(chunks)
+        items += len(obstacles) + len(pickups)
+        chunks += 1
+    elapsed = time.perf_counter() - started
+    print(f"{items} items in {chunks} chunks: {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+
+from game_input import random_inputs
+from profiler import percentile
+import recording
+import server
+
+# Load test for server.py: opens --connections connections with --worlds
+# worlds each and steps every world --ticks ticks per message until
+# --messages steps per world have been sent, e.g.
+#   python loadtest.py --spawn --connections 10 --worlds 20
+#   python loadtest.py --unix /tmp/piggy.sock --ticks 1
+#   python loadtest.py --spawn --check   (malformed requests get error replies)
+# Reports per-request latency percentiles and message/tick throughput.
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port, unix_path=None):
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path, limit=server.MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=server.MAX_LINE)
+        return cls(reader, writer)
+
+    async def request(self, **request):
+        self.writer.write(json.dumps(request).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error"))
+        return response
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+# A 5-tick recording whose runs claim 300 x 65535 ticks
+_RECORDING_BOMB = recording._HEADER.pack(recording.MAGIC, 1, 60, 5, 0, 300) + recording._RUN.pack(2, 0xFFFF) * 300
+
+# Malformed requests the server must answer with an error reply while
+# keeping the connection open
+BAD_REQUESTS = (
+    {"op": "step", "world": [1]},
+    {"op": "step", "world": {"id": 1}},
+    {"op": "state", "world": True},
+    {"op": "close", "world": "1"},
+    {"op": "new", "seed": [3]},
+    {"op": "step", "world": 1, "script": "Q:3"},
+    {"op": "verify", "recording": "AAAA"},
+    {"op": "verify", "recording": base64.b64encode(_RECORDING_BOMB).decode("ascii")},
+    {"op": "nope"},
+)
+
+
+async def check_bad_requests(args):
+    client = await Client.connect(args.host, args.port, args.unix)
+    try:
+        for request in BAD_REQUESTS:
+            try:
+                await client.request(**request)
+            except RuntimeError:
+                continue
+            raise RuntimeError(f"server accepted bad request {request}")
+        # Still usable afterwards
+        world_id = (await client.request(op="new", seed=args.seed))["world"]
+        await client.request(op="close", world=world_id)
+    finally:
+        await client.close()
+
+
+async def run_connection(args, index, latencies):
+    client = await Client.connect(args.host, args.port, args.unix)
+    try:
+        worlds = []
+        for i in range(args.worlds):
+            seed = args.seed + index * args.worlds + i
+            response = await client.request(op="new", seed=seed)
+            inputs = random_inputs(args.ticks * args.messages, seed=seed)
+            worlds.append((response["world"], inputs))
+        # Round-robin over this connection's worlds, one request in flight
+        for message in range(args.messages):
+            start = message * args.ticks
+            for world_id, inputs in worlds:
+                sent = time.perf_counter()
+                await client.request(op="step", world=world_id, inputs=inputs[start:start + args.ticks])
+                latencies.append((time.perf_counter() - sent) * 1000.0)
+    finally:
+        await client.close()
+
+
+async def run(args):
+    spawned = None
+    if args.spawn:
+        # In-process server on a free port (or the --unix path)
+        spawned = await server.SimServer(args.connections * args.worlds).start(args.host, 0, args.unix)
+        if not args.unix:
+            args.port = spawned.sockets[0].getsockname()[1]
+    latencies = []
+    started = time.perf_counter()
+    try:
+        if args.check:
+            await check_bad_requests(args)
+            started = time.perf_counter()
+        await asyncio.gather(*(run_connection(args, index, latencies) for index in range(args.connections)))
+    finally:
+        elapsed = time.perf_counter() - started
+        if spawned is not None:
+            spawned.close()
+            await spawned.wait_closed()
+    return latencies, elapsed
+
+
+def report(args, latencies, elapsed):
+    latencies.sort()
+    messages = len(latencies)
+    print(f"connections x worlds:  {args.connections} x {args.worlds}")
+    print(f"ticks per message:     {args.ticks}")
+    print(f"messages:              {messages} in {elapsed:.2f} s")
+    print(f"messages/s:            {messages / elapsed:.0f}")
+    print(f"ticks/s:               {messages * args.ticks / elapsed:.0f}")
+    print("latency ms:            p50 %.2f  p95 %.2f  p99 %.2f  max %.2f" % (
+        percentile(latencies, 50), percentile(latencies, 95), percentile(latencies, 99), latencies[-1]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the piggy simulation server")
+    parser.add_argument("--host", default=server.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=server.DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="connect to a Unix socket instead of TCP")
+    parser.add_argument("--spawn", action="store_true", help="run the server in this process")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--worlds", type=int, default=10, help="worlds per connection")
+    parser.add_argument("--ticks", type=int, default=4, help="ticks per step message")
+    parser.add_argument("--messages", type=int, default=100, help="step messages per world")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first world")
+    parser.add_argument("--check", action="store_true", help="first check that malformed requests get error replies")
+    args = parser.parse_args(argv)
+    try:
+        latencies, elapsed = asyncio.run(run(args))
+    except (ConnectionError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+    report(args, latencies, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
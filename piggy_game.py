@@ -1,413 +1,323 @@
 import pygame
 import os
 import sys
-import math  # Add this import that was missing
-import random  # Import random for placing obstacles
-import cv2  # For video playback
-
-# Initialize Pygame
-try:
-    pygame.init()
-    pygame.mixer.init()
-except:
-    print("Error initializing Pygame")
-    input("Press Enter to exit...")
-    sys.exit(1)
+import argparse
+from sprite_cache import SpriteCache
+from atlas import SpriteBatch
+from animation import AnimationTable, PIG_CLIPS
+from video_decoder import VideoFrameDecoder
+from entities import SOLID, PICKUP, NO_SPRITE
+from world import World, GROUND_Y, OINK, PICKUP_EVENT, VIDEO_PICKUP
+from dirty_renderer import DirtyRectRenderer
+from texture_screen import TextureScreen
+from timestep import SIM_HZ, FixedTimestep, AdaptiveFrameCap, max_steps_for
+from quality import QualityController
+from profiler import FrameProfiler
+from game_input import keys_to_mask
+import recording
+import asset_pack
+from asset_pack import LazyAssets
+from audio import AudioManager
 
 # Constants
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
-GROUND_Y = 500  # y-coordinate of the ground
-FPS = 60
+FPS = 60  # Default render cap; the simulation always runs at SIM_HZ
 
 # Colors
 WHITE = (255, 255, 255)
 PINK = (255, 192, 203)
 BLACK = (0, 0, 0)
 
+
+def init_pygame(headless=False):
+    # Done when a game starts rather than on import, so importing this
+    # module has no side effects
+    try:
+        pygame.init()
+        pygame.mixer.init()
+    except:
+        if headless:
+            raise
+        print("Error initializing Pygame")
+        input("Press Enter to exit...")
+        sys.exit(1)
+
 class PiggyGame:
-    def __init__(self):
+    def __init__(self, dirty_rects=False, render_fps=FPS, headless=False, profile=False, trace_path=None,
+                 seed=None, record_path=None, renderer="surface", profiler=None, adaptive_quality=False):
+        # Headless games (see headless.py) skip music, sounds and video decoding
+        self.headless = headless
+        if not pygame.get_init():
+            init_pygame(headless)
         try:
-            self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-            pygame.display.set_caption("Piggy Adventure")
+            # "texture" draws through an SDL renderer (see texture_screen.py)
+            # and falls back to the display surface if none can be created
+            self.screen = None
+            if renderer == "texture":
+                self.screen = TextureScreen.open((WINDOW_WIDTH, WINDOW_HEIGHT), "Piggy Adventure")
+            self.textured = self.screen is not None
+            if not self.textured:
+                self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+                pygame.display.set_caption("Piggy Adventure")
             self.clock = pygame.time.Clock()
-            
-            # Pig properties
-            self.pig_width = 80
-            self.pig_height = 80
-            self.pig_x = WINDOW_WIDTH // 2
-            self.pig_y = GROUND_Y - self.pig_height  # Start piggy on the ground
-            self.pig_speed = 5
-            self.facing_right = True
+            # Simulation runs in fixed ticks; rendering is capped (int), uncapped
+            # (None) or "adaptive"
+            self.timestep = FixedTimestep(SIM_HZ, max_steps_for(render_fps if isinstance(render_fps, int) else None))
+            self.render_fps = render_fps
+            self.frame_cap = AdaptiveFrameCap(SIM_HZ) if render_fps == "adaptive" else None
+            # Trades video rate, then render rate, for frame time
+            self.quality = None
+            if adaptive_quality:
+                if self.frame_cap:
+                    print("Warning: adaptive quality also adapts the render rate, ignoring --adaptive-fps")
+                    self.frame_cap = None
+                self.quality = QualityController(render_fps if isinstance(render_fps, int) else SIM_HZ)
+            # Scaled sprites are cached instead of smoothscale-ing every frame
+            self.sprite_cache = SpriteCache()
+            # Per-stage frame timings; F3 toggles the overlay
+            self.profiler = profiler or FrameProfiler(trace_path=trace_path, show_overlay=profile)
+            # Optional dirty-rectangle rendering (only changed areas are pushed)
+            if dirty_rects and self.textured:
+                print("Warning: dirty rects only apply to the surface renderer, ignoring --dirty-rects")
+                dirty_rects = False
+            self.dirty_renderer = DirtyRectRenderer(self.screen) if dirty_rects else None
+            # Game state and rules; everything below is presentation
+            self.world = World(seed, WINDOW_WIDTH, self.profiler)
+            # Interpolated pig position that is drawn
+            self.render_x = self.world.pig_x
+            self.render_y = self.world.pig_y
+            # Camera (left edge of the view in world coordinates)
+            self.camera_x = 0
+            # Per-tick input masks, written to record_path on exit
+            self.record_path = record_path
+            self.recorded_inputs = [] if record_path else None
             
             # Asset directory relative to script
-            self.asset_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
-            # Load piggy images for left movement only
-            self.piggy_fly_left_img = pygame.image.load(os.path.join(self.asset_dir, "piggy_fly_left.png")).convert_alpha()
-            self.piggy_jump_left_img = pygame.image.load(os.path.join(self.asset_dir, "piggy_jump_left.png")).convert_alpha()
-            self.piggy_sit_left_img = pygame.image.load(os.path.join(self.asset_dir, "piggy_sit_left.png")).convert_alpha()
-            # Load piggy images for right movement animation
-            self.piggy_right_imgs = [
-                pygame.image.load(os.path.join(self.asset_dir, f"piggy_right{i+1}.png")).convert_alpha()
-                for i in range(3)
-            ]
-            self.piggy_right_frame = 0
-            self.piggy_right_anim_speed = 0.15  # Animation speed
-            self.piggy_right_anim_time = 0
+            self.asset_dir = asset_pack.ASSET_DIR
+            # Images come pre-scaled from the asset pack (or decoded in parallel
+            # from the PNGs if it hasn't been built); sounds and music load lazily.
+            # Sprites are regions of one atlas sheet and are drawn in batches
+            self.images, self.atlas = asset_pack.load_images(self.asset_dir)
+            self.sprite_batch = SpriteBatch(self.atlas)
+            self.dynamic_batch = SpriteBatch(self.atlas)
+            self.assets = LazyAssets()
+            # Pig frames for every animation state, scaled, mirrored and with
+            # the walking bounce baked in (see animation.py)
+            self.pig_animations = AnimationTable(
+                PIG_CLIPS, self.images, (self.world.pig_width, self.world.pig_height)
+            )
+            # Attach the images to the world's sprite table
+            self.entities = self.world.entities
+            for name in self.world.sprite_ids:
+                self.entities.register_sprite(name, self.images[name])
             
-            # Create a pig surface with more detail
-            self.pig = pygame.Surface((self.pig_width, self.pig_height), pygame.SRCALPHA)
-            
-            # Animation properties
-            self.bounce_offset = 0
-            self.bounce_speed = 0.1
-            self.bounce_height = 3
-            self.bounce_time = 0
-            
-            # Sound effects
-            try:
-                self.oink_sound = pygame.mixer.Sound(os.path.join(self.asset_dir, "oink.mp3"))
-            except:
-                print("Warning: Could not load sound file")
-                self.oink_sound = None
-                
-            # Sound cooldown
-            self.last_sound_time = 0
-            self.sound_cooldown = 500  # milliseconds
-            # Obstacles (placed on the ground)
-            self.obstacles = [
-                pygame.Rect(250, GROUND_Y - 40, 100, 40),
-                pygame.Rect(450, GROUND_Y - 60, 120, 60),
-                pygame.Rect(650, GROUND_Y - 30, 80, 30)
-            ]
-            # Load new obstacle images
-            self.bush_img = pygame.image.load(os.path.join(self.asset_dir, "bush.png")).convert_alpha()
-            self.flower1_img = pygame.image.load(os.path.join(self.asset_dir, "flower1.png")).convert_alpha()
-            self.rock_img = pygame.image.load(os.path.join(self.asset_dir, "rock.png")).convert_alpha()
-            self.bird_img = pygame.image.load(os.path.join(self.asset_dir, "bird.png")).convert_alpha()
-            self.obstacle_sprites = []  # List of dicts: {rect, type, img, collected}
-            
-            # Flower1 video size (for video flower obstacle)
-            self.flower1_video_width = 60
-            self.flower1_video_height = 80
-            # Load flower1.mp4 as a video obstacle
-            self.flower1_video_path = os.path.join(self.asset_dir, "flower1.mp4")
-            self.flower1_video = cv2.VideoCapture(self.flower1_video_path)
-            self.flower1_video_rect = None  # Will be set in _place_extra_obstacles
-            self.flower1_video_collected = False
+            # Sound effects and music, decoded to PCM in the background and
+            # played from a reserved channel pool (see audio.py)
+            self.audio = AudioManager(self.assets, enabled=not headless)
+            # Load flower1.mp4 as a video obstacle, decoded on a background thread
+            self.flower1_video_path = os.path.join(self.asset_dir, asset_pack.VIDEO)
+            self.flower1_video = VideoFrameDecoder(
+                self.flower1_video_path, (self.world.flower1_video_width, self.world.flower1_video_height)
+            )
+            if not headless and not self.world.flower1_video_collected:
+                self.flower1_video.start()
             self.flower1_video_frame = None
             self.flower1_video_last_update = 0
-            self.flower1_video_fps = self.flower1_video.get(cv2.CAP_PROP_FPS) or 24
-            
-            self._place_extra_obstacles()
-            # Jump properties
-            self.is_jumping = False
-            self.jump_velocity = 0
-            self.jump_strength = 13
-            self.gravity = 0.7
-            # Fart sound
-            try:
-                self.fart_sound = pygame.mixer.Sound(os.path.join(self.asset_dir, "fart.mp3"))
-            except:
-                print("Warning: Could not load fart sound file")
-                self.fart_sound = None
-            # Flower properties
-            self.flower_img = pygame.image.load(os.path.join(self.asset_dir, "flowers.png")).convert_alpha()
-            self.flower_width = 50
-            self.flower_height = 50
-            self.flower_rects = [
-                pygame.Rect(350, GROUND_Y - self.flower_height, self.flower_width, self.flower_height),
-                pygame.Rect(600, GROUND_Y - self.flower_height, self.flower_width, self.flower_height)
-            ]
-            self.collected_flowers = set()
-            # Background music
-            self.music_file = os.path.join(self.asset_dir, "youcanhavesomeflowers.mp3")
-            try:
-                pygame.mixer.music.load(self.music_file)
-                pygame.mixer.music.play(-1)  # Loop indefinitely
-            except Exception as e:
-                print(f"Warning: Could not play background music: {e}")
-            # Background image
-            self.background_img = pygame.image.load(os.path.join(self.asset_dir, "background.png")).convert()
-            self.background_img = pygame.transform.smoothscale(self.background_img, (WINDOW_WIDTH, WINDOW_HEIGHT))
+            # Background image (pre-scaled to the window size)
+            self.background_img = self.images["background"]
+            if self.background_img.get_size() != (WINDOW_WIDTH, WINDOW_HEIGHT):
+                self.background_img = pygame.transform.smoothscale(self.background_img, (WINDOW_WIDTH, WINDOW_HEIGHT))
         except Exception as e:
+            if headless:
+                raise
             print(f"Error initializing game: {e}")
             input("Press Enter to exit...")
             sys.exit(1)
 
-    def draw_pig(self, surface, x, y):
-        # Only use special images when moving left or right
-        if not self.facing_right:
-            if self.is_jumping:
-                if self.jump_velocity < 0:
-                    piggy_img = self.piggy_jump_left_img  # Going up left
-                else:
-                    piggy_img = self.piggy_fly_left_img   # Falling/flying left
-            elif not self.moving:
-                piggy_img = self.piggy_sit_left_img      # Sitting left
-            else:
-                piggy_img = self.piggy_sit_left_img      # Default to sit when moving on ground left
-            # No flip needed, images are already left-facing
-        else:
-            # Animate piggy moving right
-            if self.moving:
-                self.piggy_right_anim_time += self.piggy_right_anim_speed
-                self.piggy_right_frame = int(self.piggy_right_anim_time) % len(self.piggy_right_imgs)
-            else:
-                self.piggy_right_frame = 0
-                self.piggy_right_anim_time = 0
-            piggy_img = self.piggy_right_imgs[self.piggy_right_frame]
-        # Scale image to piggy size
-        piggy_img = pygame.transform.smoothscale(piggy_img, (self.pig_width, self.pig_height))
-        surface.blit(piggy_img, (0, 0))
-        # Remove all custom drawing code below, only use the image
-        # ...existing code...
+    def pig_image(self):
+        # (surface, dy) for the pig's current animation tick
+        return self.pig_animations.frame(self.world.pig_anim)
 
-    def handle_input(self):
-        # Remove vertical movement from handle_input
-        # Only handle horizontal movement and jumping intent here
-        keys = pygame.key.get_pressed()
-        moved = False
-        self.moving = False  # Track if piggy is moving for animation
-        pig_rect = pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
-        dx = 0
-        if keys[pygame.K_LEFT]:
-            dx = -self.pig_speed
-            self.facing_right = False
-        if keys[pygame.K_RIGHT]:
-            dx = self.pig_speed
-            self.facing_right = True
-        # Move horizontally (allow in air)
-        if dx != 0:
-            new_rect = pig_rect.move(dx, 0)
-            if not self.check_collision(new_rect):
-                self.pig_x += dx
-                moved = True
-        # Jumping
-        if not self.is_jumping and keys[pygame.K_SPACE]:
-            self.is_jumping = True
-            self.jump_velocity = -self.jump_strength
-        # Play oink sound when moving (not jumping)
-        current_time = pygame.time.get_ticks()
-        if moved and not self.is_jumping and current_time - self.last_sound_time > self.sound_cooldown:
-            if self.oink_sound:
-                self.oink_sound.play()
-            self.last_sound_time = current_time
-        # Update bounce animation
-        if moved and not self.is_jumping:
-            self.bounce_time += self.bounce_speed
-            self.bounce_offset = abs(math.sin(self.bounce_time) * self.bounce_height)
-            self.moving = True
-        else:
-            self.bounce_offset = 0
-            self.bounce_time = 0
-            self.moving = False
-        # Update right-facing animation
-        if self.facing_right:
-            self.piggy_right_anim_time += self.piggy_right_anim_speed
-            if self.piggy_right_anim_time >= 1:
-                self.piggy_right_anim_time = 0
-                self.piggy_right_frame = (self.piggy_right_frame + 1) % len(self.piggy_right_imgs)
+    def draw_obstacles(self, surface=None):
+        surface = surface or self.screen
+        entities = self.entities
+        # Only obstacles in view are drawn, shifted into screen space
+        for eid in entities.in_view(self.camera_x, self.camera_x + WINDOW_WIDTH, SOLID):
+            rect = (int(entities.x[eid]) - self.camera_x, int(entities.y[eid]), int(entities.w[eid]), int(entities.h[eid]))
+            surface.fill((120, 80, 40), rect)
+    def draw_ground(self, surface=None):
+        surface = surface or self.screen
+        surface.fill((60, 180, 75), (0, GROUND_Y, WINDOW_WIDTH, WINDOW_HEIGHT - GROUND_Y))
 
-    def apply_gravity(self):
-        if self.is_jumping:
-            self.pig_y += self.jump_velocity
-            self.jump_velocity += self.gravity
-            # Check if piggy has landed
-            if self.pig_y >= WINDOW_HEIGHT - self.pig_height:
-                self.pig_y = WINDOW_HEIGHT - self.pig_height
-                self.is_jumping = False
-                self.jump_velocity = 0
-
-    def check_collisions(self):
-        pig_rect = pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
-        for obstacle in self.obstacles:
-            if pig_rect.colliderect(obstacle):
-                # Simple collision response: stop piggy from moving through the obstacle
-                if self.facing_right:
-                    self.pig_x = obstacle.left - self.pig_width
-                else:
-                    self.pig_x = obstacle.right
-                self.is_jumping = False
-                self.jump_velocity = 0
-                break
+    def draw_static_layer(self, surface):
+        # Everything that only changes when the camera moves or an item is collected
+        surface.fill(WHITE)
+        surface.blit(self.background_img, (0, 0))
+        self.draw_ground(surface)
+        self.draw_obstacles(surface)
+        self.draw_extra_obstacles(surface)
 
-    def draw_obstacles(self):
-        for obs in self.obstacles:
-            pygame.draw.rect(self.screen, (120, 80, 40), obs)
-    def draw_ground(self):
-        pygame.draw.rect(self.screen, (60, 180, 75), (0, GROUND_Y, WINDOW_WIDTH, WINDOW_HEIGHT - GROUND_Y))
+    def sprite_dest(self, image, x, y, w, h):
+        # (image, dest) drawing image at w x h: the texture renderer scales at
+        # draw time, surfaces use a cached scaled copy
+        if image.get_size() == (w, h):
+            return image, (x, y)
+        if self.textured:
+            return image, (x, y, w, h)
+        return self.sprite_cache.get(image, (w, h)), (x, y)
 
-    def check_collision(self, rect):
-        for obs in self.obstacles:
-            if rect.colliderect(obs):
-                return True
-        return False
+    def blit_dynamic(self, image, pos):
+        # Queued and drawn by draw_dynamic() in one blits call
+        self.dynamic_batch.add(image, pos)
 
-    def get_floor_y(self, pig_rect):
-        # Returns the y-coordinate where the piggy should land (ground or top of obstacle)
-        ground_y = GROUND_Y - self.pig_height
-        min_y = ground_y
-        for obs in self.obstacles:
-            # Check if pig is horizontally over the obstacle
-            if pig_rect.right > obs.left and pig_rect.left < obs.right:
-                obs_top = obs.top - self.pig_height
-                if pig_rect.bottom <= obs.top + 10 and obs_top < min_y:
-                    min_y = obs_top
-        return min_y
-
-    def draw_flowers(self):
-        for idx, rect in enumerate(self.flower_rects):
-            if idx not in self.collected_flowers:
-                flower_img = pygame.transform.smoothscale(self.flower_img, (self.flower_width, self.flower_height))
-                self.screen.blit(flower_img, (rect.x, rect.y))
-
-    def check_flower_collision(self):
-        pig_rect = pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
-        for idx, rect in enumerate(self.flower_rects):
-            if idx not in self.collected_flowers and pig_rect.colliderect(rect):
-                self.collected_flowers.add(idx)
-                if self.fart_sound:
-                    self.fart_sound.play()
-
-    def update_vertical_position(self):
-        # Always apply gravity if not standing on ground or obstacle
-        prev_y = self.pig_y
-        pig_rect = pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
-        floor_y = self.get_floor_y(pig_rect)
-        if self.is_jumping:
-            next_y = self.pig_y + self.jump_velocity
-            self.jump_velocity += self.gravity
-            # Predict next position
-            test_rect = pygame.Rect(self.pig_x, next_y, self.pig_width, self.pig_height)
-            landed = False
-            for obs in self.obstacles:
-                # Only check if moving downward and crossing the top of the obstacle
-                if prev_y + self.pig_height <= obs.top and next_y + self.pig_height >= obs.top:
-                    if test_rect.right > obs.left and test_rect.left < obs.right:
-                        self.pig_y = obs.top - self.pig_height
-                        self.is_jumping = False
-                        self.jump_velocity = 0
-                        landed = True
-                        break
-            if not landed:
-                # Check for ground
-                ground_y = GROUND_Y - self.pig_height
-                if next_y >= ground_y:
-                    self.pig_y = ground_y
-                    self.is_jumping = False
-                    self.jump_velocity = 0
-                else:
-                    self.pig_y = next_y
+    def draw_dynamic(self):
+        batch = self.dynamic_batch
+        if self.dirty_renderer:
+            self.dirty_renderer.blits(batch.items)
+            batch.clear()
         else:
-            # If not jumping, check if piggy is standing on something
-            if self.pig_y < floor_y:
-                self.is_jumping = True
-                self.jump_velocity = 0
-            else:
-                self.pig_y = floor_y
-                self.is_jumping = False
-                self.jump_velocity = 0
+            batch.draw(self.screen)
 
-    def _place_extra_obstacles(self):
-        import random
-        # Helper to avoid overlap
-        def is_overlapping(new_rect, rects):
-            for r in rects:
-                if new_rect.colliderect(r):
-                    return True
-            return False
-        placed_rects = [*self.obstacles]
-        # Place bush (on ground)
-        bush_rect = pygame.Rect(random.randint(50, 700), GROUND_Y - 60, 100, 60)
-        while is_overlapping(bush_rect, placed_rects):
-            bush_rect.x = random.randint(50, 700)
-        self.obstacle_sprites.append({'rect': bush_rect, 'type': 'bush', 'img': self.bush_img, 'collected': False})
-        placed_rects.append(bush_rect)
-        # Place flower1 (on ground)
-        flower_rect = pygame.Rect(random.randint(50, 700), GROUND_Y - 80, 60, 80)
-        while is_overlapping(flower_rect, placed_rects):
-            flower_rect.x = random.randint(50, 700)
-        self.obstacle_sprites.append({'rect': flower_rect, 'type': 'flower1', 'img': self.flower1_img, 'collected': False})
-        placed_rects.append(flower_rect)
-        # Place rock (on ground or on top of a rectangular obstacle)
-        if random.random() < 0.5:
-            # On ground
-            rock_rect = pygame.Rect(random.randint(50, 700), GROUND_Y - 50, 70, 50)
-            while is_overlapping(rock_rect, placed_rects):
-                rock_rect.x = random.randint(50, 700)
-        else:
-            # On top of a rectangular obstacle
-            obs = random.choice(self.obstacles)
-            rock_rect = pygame.Rect(obs.centerx - 35, obs.top - 50, 70, 50)
-        self.obstacle_sprites.append({'rect': rock_rect, 'type': 'rock', 'img': self.rock_img, 'collected': False})
-        placed_rects.append(rock_rect)
-        # Place bird (above a rectangular obstacle)
-        obs = random.choice(self.obstacles)
-        bird_rect = pygame.Rect(obs.centerx - 30, obs.top - 90, 60, 60)
-        self.obstacle_sprites.append({'rect': bird_rect, 'type': 'bird', 'img': self.bird_img, 'collected': False})
-        # Place flower1.mp4 video obstacle (on ground, like flower1)
-        import random
-        flower1_video_rect = pygame.Rect(random.randint(50, 700), GROUND_Y - 80, self.flower1_video_width, self.flower1_video_height)
-        def is_overlapping(new_rect, rects):
-            for r in rects:
-                if new_rect.colliderect(r):
-                    return True
-            return False
-        placed_rects = [*self.obstacles] + [o['rect'] for o in self.obstacle_sprites]
-        while is_overlapping(flower1_video_rect, placed_rects):
-            flower1_video_rect.x = random.randint(50, 700)
-        self.flower1_video_rect = flower1_video_rect
-        placed_rects.append(flower1_video_rect)
-
-    def draw_extra_obstacles(self):
-        for obs in self.obstacle_sprites:
-            if not obs["collected"]:
-                img = pygame.transform.smoothscale(obs["img"], (obs["rect"].width, obs["rect"].height))
-                self.screen.blit(img, (obs["rect"].x, obs["rect"].y))
+    def update_camera(self):
+        # Scroll once the pig walks past its starting point in the middle of the screen
+        # (the world streams chunks around the pig as it steps)
+        self.camera_x = max(0, int(self.render_x) - WINDOW_WIDTH // 2)
 
-    def check_extra_obstacle_collision(self):
-        pig_rect = pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
-        for obs in self.obstacle_sprites:
-            if not obs['collected'] and pig_rect.colliderect(obs['rect']):
-                obs['collected'] = True
-                if self.fart_sound:
-                    self.fart_sound.play()
+    def draw_extra_obstacles(self, surface=None):
+        surface = surface or self.screen
+        entities = self.entities
+        view_left = self.camera_x
+        # Uncollected sprites in view; the video flower is drawn separately
+        ids = entities.in_view(view_left, view_left + WINDOW_WIDTH, PICKUP)
+        ids = ids[entities.sprite[ids] != NO_SPRITE]
+        sprites = entities.sprites
+        batch = self.sprite_batch
+        for sprite_id, x, y, w, h in zip(entities.sprite[ids].tolist(), (entities.x[ids] - view_left).tolist(),
+                                         entities.y[ids].tolist(), entities.w[ids].tolist(), entities.h[ids].tolist()):
+            batch.add(*self.sprite_dest(sprites[sprite_id], x, y, w, h))
+        batch.draw(surface)
 
     def draw_flower1_video(self):
-        if self.flower1_video_collected:
+        rect = self.world.flower1_video_rect
+        if self.world.flower1_video_collected or rect is None:
             return
-        # Update video frame based on FPS
+        # Update video frame based on FPS; at lower quality the decoder only
+        # decodes every video_step-th frame and each is shown that much longer
+        video = self.flower1_video
+        if self.quality:
+            video.stride = self.quality.video_step
+            self.quality.stats["video_frames_dropped"] = video.frames_skipped
         now = pygame.time.get_ticks()
-        interval = int(1000 / self.flower1_video_fps)
+        interval = int(1000 * video.stride / video.fps)
         if now - self.flower1_video_last_update > interval or self.flower1_video_frame is None:
-            ret, frame = self.flower1_video.read()
-            if not ret:
-                self.flower1_video.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret, frame = self.flower1_video.read()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (self.flower1_video_width, self.flower1_video_height))
-                surf = pygame.image.frombuffer(frame.tobytes(), frame.shape[1::-1], "RGB")
-                surf.set_colorkey((0, 0, 0))  # Make black transparent
+            # Never blocks: keep showing the previous frame if the decoder is behind
+            surf = video.next_frame()
+            if surf is not None:
                 self.flower1_video_frame = surf
-            self.flower1_video_last_update = now
+                self.flower1_video_last_update = now
         if self.flower1_video_frame:
-            self.screen.blit(self.flower1_video_frame, (self.flower1_video_rect.x, self.flower1_video_rect.y))
+            self.blit_dynamic(self.flower1_video_frame, (rect.x - self.camera_x, rect.y))
 
-    def check_flower1_video_collision(self):
-        if self.flower1_video_collected:
-            return
-        pig_rect = pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
-        if pig_rect.colliderect(self.flower1_video_rect):
-            self.flower1_video_collected = True
-            if self.fart_sound:
-                self.fart_sound.play()
+    def draw_pig_sprite(self):
+        # Draw the pig with bounce offset
+        image, dy = self.pig_image()
+        self.blit_dynamic(image, (int(self.render_x) - self.camera_x, int(self.render_y) - dy))
+
+    def render_full(self):
+        profiler = self.profiler
+        with profiler.stage("background"):
+            # Clear screen
+            self.screen.fill(WHITE)
+            # Draw background FIRST
+            self.screen.blit(self.background_img, (0, 0))
+            # Draw ground
+            self.draw_ground()
+            # Draw obstacles
+            self.draw_obstacles()
+        with profiler.stage("sprites"):
+            # Extra obstacles and flowers (one batch), then the pig on top
+            self.draw_extra_obstacles()
+            self.draw_pig_sprite()
+        with profiler.stage("video"):
+            # Draw flower1 video if not collected
+            self.draw_flower1_video()
+        self.draw_profiler_overlay()
+        with profiler.stage("sprites"):
+            self.draw_dynamic()
+
+    def render_dirty(self):
+        profiler = self.profiler
+        with profiler.stage("background"):
+            # Static layer is rebuilt only when the camera moves or an item is collected
+            self.dirty_renderer.begin_frame((self.camera_x, self.world.layout_version), self.draw_static_layer)
+        with profiler.stage("sprites"):
+            self.draw_pig_sprite()
+        with profiler.stage("video"):
+            self.draw_flower1_video()
+        self.draw_profiler_overlay()
+        with profiler.stage("sprites"):
+            self.draw_dynamic()
+
+    def present(self):
+        if self.textured:
+            self.screen.present()
+        else:
+            pygame.display.flip()
+
+    def draw_profiler_overlay(self):
+        if self.profiler.show_overlay:
+            self.blit_dynamic(self.profiler.overlay_surface(), (8, 8))
+
+    def step(self, mask=None):
+        # One fixed simulation tick; mask defaults to the keyboard
+        if mask is None:
+            mask = keys_to_mask(pygame.key.get_pressed())
+        if self.recorded_inputs is not None:
+            self.recorded_inputs.append(mask)
+        self.world.step(mask)
+        for event in self.world.drain_events():
+            if event == OINK:
+                self.audio.play("oink")
+            elif event == PICKUP_EVENT:
+                self.audio.play("fart")
+            elif event == VIDEO_PICKUP:
+                # Don't wait for the decoder thread mid-frame; run() joins it on exit
+                self.flower1_video.stop(wait=False)
+                self.audio.play("fart")
+
+    def interpolate(self, alpha):
+        world = self.world
+        prev_x, prev_y = world.prev_pig_pos
+        self.render_x = prev_x + (world.pig_x - prev_x) * alpha
+        self.render_y = prev_y + (world.pig_y - prev_y) * alpha
+
+    def tick_clock(self):
+        # Returns the real time the frame took, in seconds
+        if self.quality:
+            ms = self.clock.tick(self.quality.update(self.clock.get_rawtime()))
+        elif self.frame_cap:
+            ms = self.clock.tick(self.frame_cap.update(self.clock.get_rawtime()))
+        elif self.render_fps:
+            ms = self.clock.tick(self.render_fps)
+        else:
+            ms = self.clock.tick()
+        return ms / 1000.0
+
+    def save_recording(self):
+        try:
+            world = self.world
+            recording.save(self.record_path, recording.Recording(world.seed, self.recorded_inputs, world.state_checksum()))
+            print(f"Recorded {len(self.recorded_inputs)} ticks to {self.record_path}")
+        except Exception as e:
+            print(f"Warning: could not save recording: {e}")
 
     def run(self):
         try:
             running = True
+            frame_seconds = self.timestep.dt
             while running:
+                self.profiler.begin_frame()
                 # Event handling
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
@@ -415,53 +325,75 @@ class PiggyGame:
                     elif event.type == pygame.KEYDOWN:
                         if event.key == pygame.K_ESCAPE:
                             running = False
+                        elif event.key == pygame.K_F3:
+                            self.profiler.toggle_overlay()
+                    elif event.type == pygame.VIDEORESIZE:
+                        # Sprite sizes may change with the window, rescale lazily
+                        self.sprite_cache.invalidate()
+                        if self.dirty_renderer:
+                            self.dirty_renderer.invalidate()
 
-                # Handle input
-                self.handle_input()
-                # Always update vertical position (gravity/falling)
-                self.update_vertical_position()
+                # Run as many fixed ticks as real time has accumulated
+                mask = keys_to_mask(pygame.key.get_pressed())
+                for _ in range(self.timestep.advance(frame_seconds)):
+                    self.step(mask)
+                self.audio.end_frame()
+                self.interpolate(self.timestep.alpha)
+                # Follow the pig (World.step streams the chunks around it)
+                self.update_camera()
 
-                # Clear screen
-                self.screen.fill(WHITE)
-                # Draw background FIRST
-                self.screen.blit(self.background_img, (0, 0))
-                # Draw ground
-                self.draw_ground()
-                # Draw obstacles
-                self.draw_obstacles()
-                
-                # Create new pig surface and draw pig
-                self.pig.fill((0, 0, 0, 0))  # Clear with transparency
-                self.draw_pig(self.pig, 0, 0)
-                
-                # Draw the pig with bounce offset
-                self.screen.blit(self.pig, (self.pig_x, self.pig_y - self.bounce_offset))
-                # Draw flowers
-                self.draw_flowers()
-                # Draw extra obstacles
-                self.draw_extra_obstacles()
-                # Draw flower1 video if not collected
-                self.draw_flower1_video()
-                # Check for flower collision
-                self.check_flower_collision()
-                # Check for extra obstacle collision
-                self.check_extra_obstacle_collision()
-                # Check for flower1 video collision
-                self.check_flower1_video_collision()
+                if self.dirty_renderer:
+                    self.render_dirty()
+                else:
+                    self.render_full()
 
-                pygame.display.flip()
-                self.clock.tick(FPS)
+                with self.profiler.stage("flip"):
+                    if self.dirty_renderer:
+                        self.dirty_renderer.end_frame()
+                    else:
+                        self.present()
+                with self.profiler.stage("wait"):
+                    frame_seconds = self.tick_clock()
+                self.profiler.end_frame()
 
         except Exception as e:
             print(f"Error during game loop: {e}")
             input("Press Enter to exit...")
         finally:
+            if self.record_path:
+                self.save_recording()
+            self.flower1_video.stop()
+            self.audio.shutdown()
+            self.assets.shutdown()
+            self.profiler.close()
+            if self.quality:
+                print(f"Quality: ended at {self.quality.name}, {self.quality.stats}")
             pygame.quit()
             sys.exit()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Piggy Adventure")
+    parser.add_argument("--dirty-rects", action="store_true", help="only redraw the parts of the screen that changed")
+    parser.add_argument("--fps", type=int, default=FPS, help="render cap, 0 for uncapped (simulation stays at %d Hz)" % SIM_HZ)
+    parser.add_argument("--adaptive-fps", action="store_true", help="lower the render cap automatically when frames overrun")
+    parser.add_argument("--adaptive-quality", action="store_true",
+                        help="lower video rate and render rate automatically when frames overrun")
+    parser.add_argument("--profile", action="store_true", help="start with the frame timing overlay shown (F3 toggles it)")
+    parser.add_argument("--profile-trace", metavar="CSV", help="write per-frame stage timings to this file")
+    parser.add_argument("--seed", type=int, help="level seed (random by default)")
+    parser.add_argument("--renderer", choices=("surface", "texture"), default="surface",
+                        help="draw with software surfaces or an SDL texture renderer")
+    parser.add_argument("--record", metavar="FILE", help="record input to a replay file (see replay.py)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
     try:
-        game = PiggyGame()
+        args = parse_args()
+        render_fps = "adaptive" if args.adaptive_fps else (args.fps or None)
+        game = PiggyGame(dirty_rects=args.dirty_rects, render_fps=render_fps,
+                         profile=args.profile, trace_path=args.profile_trace,
+                         seed=args.seed, record_path=args.record, renderer=args.renderer,
+                         adaptive_quality=args.adaptive_quality)
         game.run()
     except Exception as e:
         print(f"Fatal error: {e}")
@@ -0,0 +1,146 @@
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+
+# Stages in the order they are shown; anything else timed is appended
+STAGES = ("input", "physics", "collision", "background", "sprites", "video", "flip", "wait")
+# Frames kept for the rolling percentiles (5 s at 60 FPS)
+DEFAULT_WINDOW = 300
+# How often the overlay text is re-rendered, in milliseconds
+OVERLAY_REFRESH_MS = 250
+
+_NULL_STAGE = nullcontext()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000.0
+        return False
+
+
+class FrameProfiler:
+    # Times each stage of a frame (stages entered several times per frame,
+    # e.g. physics over several fixed ticks, are summed), keeps rolling
+    # p50/p95/p99 per stage, draws them as an overlay and can write one CSV
+    # line per frame for offline analysis.
+    def __init__(self, window=DEFAULT_WINDOW, trace_path=None, show_overlay=False, enabled=False):
+        self.window = window
+        self.show_overlay = show_overlay
+        # Collect timings even without overlay or trace (replays, benchmarks)
+        self.enabled = enabled
+        self.history = {}  # stage -> deque of ms
+        self.current = {}
+        self.frame_count = 0
+        self._stages = {}
+        self._frame_start = None
+        self._trace = None
+        self._trace_columns = None
+        if trace_path:
+            self._trace = open(trace_path, "w", buffering=1 << 16)
+        self._font = None
+        self._overlay = None
+        self._overlay_time = -OVERLAY_REFRESH_MS
+
+    @property
+    def active(self):
+        return self.enabled or self.show_overlay or self._trace is not None
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+
+    def stage(self, name):
+        if not self.active:
+            return _NULL_STAGE
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage(self, name)
+        return stage
+
+    def begin_frame(self):
+        self.current = {}
+        if self.active:
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        current = self.current
+        current["frame"] = (time.perf_counter() - self._frame_start) * 1000.0
+        self._frame_start = None
+        for name, ms in current.items():
+            history = self.history.get(name)
+            if history is None:
+                history = self.history[name] = deque(maxlen=self.window)
+            history.append(ms)
+        if self._trace is not None:
+            self._write_trace(current)
+        self.frame_count += 1
+        self.current = {}
+
+    def _write_trace(self, current):
+        if self._trace_columns is None:
+            self._trace_columns = ["frame"] + list(STAGES)
+            self._trace.write("index,frame_ms," + ",".join(f"{s}_ms" for s in STAGES) + "\n")
+        values = [f"{current.get(name, 0.0):.3f}" for name in self._trace_columns]
+        self._trace.write(f"{self.frame_count}," + ",".join(values) + "\n")
+
+    def percentiles(self, name):
+        values = sorted(self.history.get(name, ()))
+        return percentile(values, 50), percentile(values, 95), percentile(values, 99)
+
+    def summary(self):
+        # {stage: (p50, p95, p99)} for everything recorded so far
+        names = [name for name in ("frame",) + STAGES if name in self.history]
+        names += sorted(name for name in self.history if name not in names)
+        return {name: self.percentiles(name) for name in names}
+
+    def overlay_surface(self):
+        now = pygame.time.get_ticks()
+        if self._overlay is not None and now - self._overlay_time < OVERLAY_REFRESH_MS:
+            return self._overlay
+        if self._font is None:
+            self._font = pygame.font.Font(None, 18)
+        rows = [("ms", "p50", "p95", "p99")]
+        for name, values in self.summary().items():
+            rows.append((name,) + tuple(f"{v:.2f}" for v in values))
+        # Name column left-aligned, numbers right-aligned in fixed columns
+        column_right = (0, 120, 165, 210)
+        line_height = self._font.get_linesize()
+        overlay = pygame.Surface((column_right[-1] + 8, line_height * len(rows) + 8))
+        overlay.fill((0, 0, 0))
+        overlay.set_alpha(180)
+        for row_index, row in enumerate(rows):
+            y = 4 + row_index * line_height
+            for col, text in enumerate(row):
+                cell = self._font.render(text, True, (255, 255, 255))
+                x = 4 if col == 0 else column_right[col] - cell.get_width()
+                overlay.blit(cell, (x, y))
+        self._overlay = overlay
+        self._overlay_time = now
+        return overlay
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
@@ -0,0 +1,51 @@
+from timestep import SIM_HZ, AdaptiveFrameCap
+
+# Adaptive quality: an AdaptiveFrameCap whose first step down is a cheaper
+# video instead of a lower render rate. While frames overrun their budget it
+# walks down the levels, and back up once there is plenty of headroom again.
+#
+# Each level is (name, video_step, fps):
+#   video_step  decode every Nth video frame and show it N times as long; the
+#               decoder grabs the ones between without retrieving or
+#               converting them (this saves work while the clip is decoded,
+#               not once a short clip is looping from memory)
+#   fps         render cap; only the caps AdaptiveFrameCap allows, so every
+#               frame still runs whole ticks and the simulation stays at SIM_HZ
+VIDEO_STEP = 2
+
+
+class QualityController(AdaptiveFrameCap):
+    def __init__(self, fps=SIM_HZ, window=30, log=True):
+        super().__init__(SIM_HZ, window=window, max_fps=fps)
+        render_caps = self.caps
+        self.levels = [("full", 1, render_caps[0]), ("video 1/%d" % VIDEO_STEP, VIDEO_STEP, render_caps[0])]
+        self.levels += [(f"render {cap} fps", VIDEO_STEP, cap) for cap in render_caps[1:]]
+        self.caps = [cap for _, _, cap in self.levels]
+        self.log = log
+        self.stats = {"level": 0, "frames": 0, "overruns": 0, "downgrades": 0, "upgrades": 0,
+                      "video_frames_dropped": 0}
+
+    @property
+    def name(self):
+        return self.levels[self.level][0]
+
+    @property
+    def video_step(self):
+        return self.levels[self.level][1]
+
+    def update(self, work_ms):
+        # Returns the render cap to use, like AdaptiveFrameCap.update
+        stats = self.stats
+        stats["frames"] += 1
+        budget = 1000.0 / self.fps
+        if work_ms > budget:
+            stats["overruns"] += 1
+        old = self.level
+        fps = super().update(work_ms)
+        if self.level != old:
+            stats["level"] = self.level
+            stats["downgrades" if self.level > old else "upgrades"] += 1
+            if self.log:
+                print(f"Quality: {self.levels[old][0]} -> {self.name} "
+                      f"(frames take {self.last_average:.1f} ms of a {budget:.1f} ms budget)")
+        return fps
@@ -0,0 +1,76 @@
+import struct
+
+from timestep import SIM_HZ
+
+# Binary input recordings. A recording is the level seed plus one input
+# bitmask per simulation tick (see game_input.py), run-length encoded, and a
+# checksum of the final game state so replays can prove they matched.
+#
+#   header: magic, seed (int64), tick rate (uint16), ticks (uint32),
+#           final state checksum (uint32), number of runs (uint32)
+#   runs:   (mask uint8, length uint16) * number of runs
+
+MAGIC = b"PIGREC\x00\x01"
+_HEADER = struct.Struct("<8sqHIII")
+_RUN = struct.Struct("<BH")
+MAX_RUN = 0xFFFF
+
+
+class Recording:
+    def __init__(self, seed, inputs, checksum=0, tick_rate=SIM_HZ):
+        self.seed = seed
+        self.inputs = list(inputs)
+        self.checksum = checksum
+        self.tick_rate = tick_rate
+
+    def __len__(self):
+        return len(self.inputs)
+
+
+def encode_runs(inputs):
+    runs = []
+    for mask in inputs:
+        if runs and runs[-1][0] == mask and runs[-1][1] < MAX_RUN:
+            runs[-1][1] += 1
+        else:
+            runs.append([mask, 1])
+    return runs
+
+
+def dumps(recording):
+    runs = encode_runs(recording.inputs)
+    parts = [_HEADER.pack(MAGIC, recording.seed, recording.tick_rate, len(recording.inputs),
+                          recording.checksum & 0xFFFFFFFF, len(runs))]
+    parts.extend(_RUN.pack(mask, length) for mask, length in runs)
+    return b"".join(parts)
+
+
+def loads(data, max_ticks=None):
+    # max_ticks rejects longer recordings before their runs are expanded
+    # (server.py checks recordings from untrusted clients)
+    magic, seed, tick_rate, ticks, checksum, run_count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a piggy input recording")
+    if max_ticks is not None and ticks > max_ticks:
+        raise ValueError(f"recording has {ticks} ticks, at most {max_ticks} allowed")
+    inputs = []
+    offset = _HEADER.size
+    for _ in range(run_count):
+        mask, length = _RUN.unpack_from(data, offset)
+        if len(inputs) + length > ticks:
+            raise ValueError(f"recording runs add up to more than its {ticks} ticks")
+        inputs.extend([mask] * length)
+        offset += _RUN.size
+    if len(inputs) != ticks:
+        raise ValueError(f"recording is truncated: {len(inputs)} of {ticks} ticks")
+    return Recording(seed, inputs, checksum, tick_rate)
+
+
+def save(path, recording):
+    with open(path, "wb") as f:
+        f.write(dumps(recording))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
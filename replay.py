@@ -0,0 +1,199 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import headless
+import recording
+from game_input import parse_script
+from profiler import FrameProfiler
+from timestep import SIM_HZ
+
+# Replays input recordings through a headless PiggyGame as fast as possible,
+# checks the final state matches the recording and reports per-stage timings.
+#
+#   python piggy_game.py --seed 7 --record run.pigrec      # record a session
+#   python replay.py play run.pigrec                        # replay + timings
+#   python replay.py record-script out.pigrec --seed 7 --script "R:600 RJ:10"
+#   python replay.py check replays/ --baseline replays/baseline.json
+#   python replay.py update replays/*.pigrec   # after changing level generation
+#
+# "check" is the performance regression suite: it fails when a recording no
+# longer replays identically or a stage's p50/p95/p99 exceeds the baseline by
+# more than the tolerance. Baselines are machine-specific and not committed;
+# CI boxes keep their own and pass --require-baseline so a missing one fails
+# the build instead of silently skipping the timing comparison.
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
+DEFAULT_TOLERANCE = 0.25
+# Differences below this are timer noise, whatever the ratio (ms)
+NOISE_FLOOR_MS = 0.05
+
+
+def replay(rec, render=True, trace_path=None, renderer="surface"):
+    if rec.tick_rate != SIM_HZ:
+        raise ValueError(f"recorded at {rec.tick_rate} Hz but the simulation runs at {SIM_HZ} Hz")
+    profiler = FrameProfiler(window=max(1, len(rec)), trace_path=trace_path, enabled=True)
+    episode = headless.HeadlessGame(seed=rec.seed, render=render, renderer=renderer, profiler=profiler)
+    world = episode.world
+    started = time.perf_counter()
+    episode.run(rec.inputs)
+    elapsed = time.perf_counter() - started
+    result = {
+        "ticks": len(rec),
+        "seconds": elapsed,
+        "ticks_per_second": len(rec) / elapsed if elapsed > 0 else float("inf"),
+        "checksum": world.state_checksum(),
+        "matches": world.state_checksum() == rec.checksum,
+        "stages": profiler.summary(),
+    }
+    profiler.close()
+    episode.close()
+    return result
+
+
+def best_of(rec, repeat, render=True, renderer="surface"):
+    # Lowest value of each percentile over several runs, to filter out noise
+    results = [replay(rec, render=render, renderer=renderer) for _ in range(repeat)]
+    best = dict(results[0])
+    best["matches"] = all(r["matches"] for r in results)
+    best["ticks_per_second"] = max(r["ticks_per_second"] for r in results)
+    best["stages"] = {
+        stage: [min(r["stages"][stage][i] for r in results if stage in r["stages"]) for i in range(3)]
+        for stage in results[0]["stages"]
+    }
+    return best
+
+
+def print_result(name, result):
+    status = "ok" if result["matches"] else "STATE MISMATCH"
+    print(f"{name}: {result['ticks']} ticks, {result['ticks_per_second']:.0f} ticks/s, {status}")
+    print(f"  {'stage':<12}{'p50':>8}{'p95':>8}{'p99':>8}  ms")
+    for stage, (p50, p95, p99) in result["stages"].items():
+        print(f"  {stage:<12}{p50:8.3f}{p95:8.3f}{p99:8.3f}")
+
+
+def compare(name, stages, baseline, tolerance):
+    regressions = []
+    for stage, values in stages.items():
+        base = baseline.get(stage)
+        if not base:
+            continue
+        for label, now, before in zip(("p50", "p95", "p99"), values, base):
+            if now > before * (1 + tolerance) and now - before > NOISE_FLOOR_MS:
+                regressions.append(f"{name}: {stage} {label} {before:.3f} -> {now:.3f} ms")
+    return regressions
+
+
+def cmd_play(args):
+    rec = recording.load(args.file)
+    result = replay(rec, render=not args.no_render, trace_path=args.trace, renderer=args.renderer)
+    print_result(os.path.basename(args.file), result)
+    return 0 if result["matches"] else 1
+
+
+def cmd_record_script(args):
+    inputs = parse_script(args.script)
+    episode = headless.HeadlessGame(seed=args.seed)
+    episode.run(inputs)
+    rec = recording.Recording(args.seed, inputs, episode.world.state_checksum())
+    episode.close()
+    recording.save(args.file, rec)
+    print(f"Wrote {args.file}: {len(rec)} ticks, {len(recording.encode_runs(inputs))} runs")
+    return 0
+
+
+def cmd_update(args):
+    # Re-run recordings and store their new final state, for intentional
+    # changes to the simulation or level layout
+    for path in args.files:
+        rec = recording.load(path)
+        episode = headless.HeadlessGame(seed=rec.seed)
+        episode.run(rec.inputs)
+        checksum = episode.world.state_checksum()
+        episode.close()
+        if checksum != rec.checksum:
+            rec.checksum = checksum
+            recording.save(path, rec)
+            print(f"Updated {path}")
+    return 0
+
+
+def cmd_check(args):
+    paths = sorted(glob.glob(os.path.join(args.dir, "*.pigrec")))
+    if not paths:
+        print(f"No recordings in {args.dir}")
+        return 1
+    baseline_path = args.baseline or os.path.join(args.dir, "baseline.json")
+    baseline = {}
+    if os.path.exists(baseline_path) and not args.update_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    failures = []
+    current = {}
+    for path in paths:
+        name = os.path.basename(path)
+        result = best_of(recording.load(path), args.repeat, render=not args.no_render, renderer=args.renderer)
+        print_result(name, result)
+        current[name] = result["stages"]
+        if not result["matches"]:
+            failures.append(f"{name}: final state differs from the recording")
+        if name in baseline:
+            failures.extend(compare(name, result["stages"], baseline[name], args.tolerance))
+        elif args.require_baseline and baseline:
+            failures.append(f"{name}: no timings in the baseline")
+    if args.update_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"Wrote baseline {baseline_path}")
+    elif not baseline:
+        print(f"No baseline at {baseline_path}, timings not compared (use --update-baseline)")
+        if args.require_baseline:
+            failures.append(f"baseline {baseline_path} is missing")
+    for failure in failures:
+        print("FAIL", failure)
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay piggy input recordings")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    play = sub.add_parser("play", help="replay one recording and print stage timings")
+    play.add_argument("file")
+    play.add_argument("--no-render", action="store_true", help="simulation only")
+    play.add_argument("--trace", metavar="CSV", help="write per-tick stage timings")
+    play.add_argument("--renderer", choices=("surface", "texture"), default="surface")
+    play.set_defaults(func=cmd_play)
+
+    script = sub.add_parser("record-script", help="create a recording from an input script")
+    script.add_argument("file")
+    script.add_argument("--seed", type=int, required=True)
+    script.add_argument("--script", required=True, help='e.g. "R:120 RJ:5 .:30"')
+    script.set_defaults(func=cmd_record_script)
+
+    update = sub.add_parser("update", help="rewrite the final state checksum of recordings")
+    update.add_argument("files", nargs="+")
+    update.set_defaults(func=cmd_update)
+
+    check = sub.add_parser("check", help="replay every recording in a directory against a timing baseline")
+    check.add_argument("dir", nargs="?", default=DEFAULT_DIR)
+    check.add_argument("--baseline", help="baseline JSON (default: DIR/baseline.json)")
+    check.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                       help="allowed relative slowdown per percentile (default %(default)s)")
+    check.add_argument("--repeat", type=int, default=3, help="runs per recording, best is kept")
+    check.add_argument("--no-render", action="store_true", help="simulation only")
+    check.add_argument("--renderer", choices=("surface", "texture"), default="surface")
+    check.add_argument("--update-baseline", action="store_true", help="write current timings as the new baseline")
+    check.add_argument("--require-baseline", action="store_true",
+                       help="fail when the baseline is missing or has no timings for a recording (for CI)")
+    check.set_defaults(func=cmd_check)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import itertools
+import json
+import struct
+import sys
+
+import recording
+from game_input import parse_script
+from world import World
+
+# Hosts many Worlds in one process behind newline-delimited JSON over a
+# local socket, e.g.
+#   python server.py --port 8765
+#   python server.py --unix /tmp/piggy.sock
+#
+# Each line is one request object with an "op"; each gets one response line
+# {"ok": true, ...} or {"ok": false, "error": "..."}, echoing "req" if given.
+#   {"op": "new", "seed": 3}                        -> {"world": 1, "seed": 3}
+#   {"op": "step", "world": 1, "inputs": [2, 2, 6]} -> {"state": {...}, "checksum": n}
+#   {"op": "step", "world": 1, "script": "R:120 RJ:5"}
+#   {"op": "state", "world": 1}                     -> {"state": {...}, "checksum": n}
+#   {"op": "close", "world": 1}
+#   {"op": "verify", "recording": "<base64 .pigrec>"} -> {"match": true, ...}
+# Worlds belong to the connection that created them and are dropped when it
+# disconnects. Stepping is synchronous, so long requests yield to the event
+# loop every YIELD_TICKS ticks to keep other connections responsive.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+YIELD_TICKS = 256
+# Ticks one step request may run (10 minutes at 60 Hz)
+MAX_STEP_TICKS = 36000
+DEFAULT_MAX_WORLDS = 1000
+# Longest request line accepted (a base64 recording is the largest)
+MAX_LINE = 4 * 1024 * 1024
+
+
+class RequestError(Exception):
+    pass
+
+
+async def run_inputs(world, inputs):
+    # world.run() that lets other connections in every YIELD_TICKS ticks
+    step = world.step
+    for i, mask in enumerate(inputs, 1):
+        step(mask)
+        if i % YIELD_TICKS == 0:
+            await asyncio.sleep(0)
+
+
+class SimServer:
+    def __init__(self, max_worlds=DEFAULT_MAX_WORLDS):
+        self.max_worlds = max_worlds
+        self.worlds = {}  # id -> World
+        self._ids = itertools.count(1)
+        self.stats = {"connections": 0, "requests": 0, "errors": 0, "ticks": 0}
+
+    def _world(self, request, owned):
+        world_id = request.get("world")
+        # Checked first: unhashable ids ([1], {}) can't even be looked up
+        if not isinstance(world_id, int) or isinstance(world_id, bool):
+            raise RequestError(f"world must be a world id, not {world_id!r}")
+        if world_id not in owned:
+            raise RequestError(f"unknown world {world_id!r}")
+        return self.worlds[world_id]
+
+    def _inputs(self, request):
+        if "script" in request:
+            script = request["script"]
+            try:
+                # Count first so "R:999999999" doesn't get expanded
+                ticks = sum(int(token.partition(":")[2] or 1) for token in script.split())
+                if ticks > MAX_STEP_TICKS:
+                    raise RequestError(f"at most {MAX_STEP_TICKS} ticks per step")
+                inputs = parse_script(script)
+            except (AttributeError, KeyError, ValueError) as e:
+                raise RequestError(f"bad script: {e!r}")
+        else:
+            inputs = request.get("inputs", [])
+            if not isinstance(inputs, list) or not all(isinstance(mask, int) for mask in inputs):
+                raise RequestError("inputs must be a list of input masks")
+        if len(inputs) > MAX_STEP_TICKS:
+            raise RequestError(f"at most {MAX_STEP_TICKS} ticks per step")
+        return inputs
+
+    async def handle(self, request, owned):
+        op = request.get("op")
+        if op == "new":
+            if len(self.worlds) >= self.max_worlds:
+                raise RequestError(f"server is full ({self.max_worlds} worlds)")
+            seed = request.get("seed")
+            if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+                raise RequestError("seed must be an integer")
+            world = World(seed, record_events=False)
+            world_id = next(self._ids)
+            self.worlds[world_id] = world
+            owned.add(world_id)
+            return {"world": world_id, "seed": world.seed}
+        if op == "step":
+            world = self._world(request, owned)
+            inputs = self._inputs(request)
+            await run_inputs(world, inputs)
+            self.stats["ticks"] += len(inputs)
+            return {"state": world.state(), "checksum": world.state_checksum()}
+        if op == "state":
+            world = self._world(request, owned)
+            return {"state": world.state(), "checksum": world.state_checksum()}
+        if op == "close":
+            self._world(request, owned)
+            owned.discard(request["world"])
+            del self.worlds[request["world"]]
+            return {}
+        if op == "verify":
+            try:
+                data = base64.b64decode(request.get("recording", ""), validate=True)
+                rec = recording.loads(data, max_ticks=MAX_STEP_TICKS)
+            except (binascii.Error, struct.error, ValueError, TypeError) as e:
+                raise RequestError(f"bad recording: {e}")
+            world = World(rec.seed, record_events=False)
+            await run_inputs(world, rec.inputs)
+            self.stats["ticks"] += len(rec)
+            checksum = world.state_checksum()
+            return {"match": checksum == rec.checksum, "checksum": checksum,
+                    "expected": rec.checksum, "ticks": len(rec), "state": world.state()}
+        raise RequestError(f"unknown op {op!r}")
+
+    async def serve_connection(self, reader, writer):
+        self.stats["connections"] += 1
+        owned = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # Line longer than MAX_LINE; the stream can't be resynced
+                    writer.write(b'{"ok": false, "error": "request too long"}\n')
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self._respond(line, owned)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for world_id in owned:
+                self.worlds.pop(world_id, None)
+            writer.close()
+
+    async def _respond(self, line, owned):
+        self.stats["requests"] += 1
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            self.stats["errors"] += 1
+            return {"ok": False, "error": f"bad JSON: {e}"}
+        if not isinstance(request, dict):
+            self.stats["errors"] += 1
+            return {"ok": False, "error": "request must be a JSON object"}
+        try:
+            response = await self.handle(request, owned)
+            response["ok"] = True
+        except RequestError as e:
+            self.stats["errors"] += 1
+            response = {"ok": False, "error": str(e)}
+        if "req" in request:
+            response["req"] = request["req"]
+        return response
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            return await asyncio.start_unix_server(self.serve_connection, unix_path, limit=MAX_LINE)
+        return await asyncio.start_server(self.serve_connection, host, port, limit=MAX_LINE)
+
+
+async def serve(args):
+    sim = SimServer(args.max_worlds)
+    server = await sim.start(args.host, args.port, args.unix)
+    where = args.unix or "%s:%d" % server.sockets[0].getsockname()[:2]
+    print(f"piggy server on {where} (max {args.max_worlds} worlds)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve piggy simulations over a local socket")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-worlds", type=int, default=DEFAULT_MAX_WORLDS)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
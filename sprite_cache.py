@@ -0,0 +1,56 @@
+import pygame
+from collections import OrderedDict
+
+# Default number of scaled surfaces kept around (pig frames, flowers, obstacles...)
+DEFAULT_MAX_ENTRIES = 128
+
+
+def prepare_sprite(image, size, flip=False):
+    # New copy of image at size, mirrored horizontally if flip, in the
+    # display's format when there is one
+    surface = image if image.get_size() == tuple(size) else pygame.transform.smoothscale(image, size)
+    if flip:
+        surface = pygame.transform.flip(surface, True, False)
+    # convert_alpha needs a display surface; keep the raw surface otherwise
+    if pygame.display.get_surface() is not None:
+        surface = surface.convert_alpha()
+    elif surface is image:
+        surface = image.copy()
+    return surface
+
+
+class SpriteCache:
+    # Scales each (image, size) pair once and hands back the same surface
+    # every frame instead of calling smoothscale in the render loop.
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (id(image), w, h) -> (image, scaled)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image, size):
+        width, height = int(size[0]), int(size[1])
+        key = (id(image), width, height)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        scaled = prepare_sprite(image, (width, height))
+        # Keep a reference to the source image so its id() can't be reused
+        self._entries[key] = (image, scaled)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return scaled
+
+    def invalidate(self, image=None):
+        # Drop everything (e.g. on window resize) or only the sizes of one image
+        if image is None:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] == id(image)]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
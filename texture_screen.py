@@ -0,0 +1,90 @@
+from collections import OrderedDict
+
+import pygame
+
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:
+    Window = Renderer = Texture = None
+
+# Textures kept around; sprites, the background and the atlas sheet are hit
+# every frame, video frames and overlay refreshes churn through the rest
+DEFAULT_MAX_TEXTURES = 256
+
+
+class TextureScreen:
+    # Stands in for the display surface when rendering through an SDL
+    # Renderer (pygame._sdl2.video). fill/blit/blits become renderer draws of
+    # textures uploaded once per source surface, so blending and scaling
+    # happen in the renderer instead of in CPU surface blits. A dest with a
+    # size (x, y, w, h) is scaled at draw time. present() replaces
+    # pygame.display.flip().
+    def __init__(self, size, title, vsync=False, max_textures=DEFAULT_MAX_TEXTURES):
+        self.size = tuple(size)
+        self.window = Window(title, size=self.size)
+        # Accelerated if the platform has it, the software renderer otherwise
+        self.renderer = Renderer(self.window, accelerated=-1, vsync=vsync)
+        self.max_textures = max_textures
+        self._textures = OrderedDict()  # id(surface) -> (surface, texture)
+
+    @classmethod
+    def open(cls, size, title, vsync=False):
+        # None if pygame._sdl2 or a renderer isn't available here
+        if Window is None:
+            print("Warning: pygame._sdl2 is not available, using the surface renderer")
+            return None
+        try:
+            return cls(size, title, vsync)
+        except Exception as e:
+            print(f"Warning: could not create a texture renderer ({e}), using the surface renderer")
+            return None
+
+    def get_size(self):
+        return self.size
+
+    def get_rect(self):
+        return pygame.Rect((0, 0), self.size)
+
+    def texture(self, surface):
+        key = id(surface)
+        entry = self._textures.get(key)
+        if entry is not None:
+            self._textures.move_to_end(key)
+            return entry[1]
+        texture = Texture.from_surface(self.renderer, surface)
+        # Keep a reference to the surface so its id() can't be reused
+        self._textures[key] = (surface, texture)
+        if len(self._textures) > self.max_textures:
+            self._textures.popitem(last=False)
+        return texture
+
+    def invalidate(self):
+        self._textures.clear()
+
+    def fill(self, color, rect=None):
+        renderer = self.renderer
+        renderer.draw_color = pygame.Color(color)
+        if rect is None:
+            renderer.clear()
+            return self.get_rect()
+        rect = pygame.Rect(rect)
+        renderer.fill_rect(rect)
+        return rect
+
+    def blit(self, source, dest, area=None):
+        if area is None:
+            area = source.get_rect()
+        if len(dest) == 4:
+            rect = pygame.Rect(dest)
+        else:
+            rect = pygame.Rect(int(dest[0]), int(dest[1]), area[2], area[3])
+        self.texture(source).draw(srcrect=area, dstrect=rect)
+        return rect
+
+    def blits(self, blit_sequence, doreturn=True):
+        blit = self.blit
+        rects = [blit(*item) for item in blit_sequence]
+        return rects if doreturn else None
+
+    def present(self):
+        self.renderer.present()
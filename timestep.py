@@ -0,0 +1,81 @@
+from collections import deque
+
+# Simulation ticks per second; the physics constants are tuned for this rate
+SIM_HZ = 60
+# Never run more than this many ticks for one rendered frame (avoids a
+# spiral of death after a long stall such as a window drag)
+MAX_STEPS_PER_FRAME = 5
+
+
+def max_steps_for(fps, tick_rate=SIM_HZ, max_steps=MAX_STEPS_PER_FRAME):
+    # Tick limit for a render cap. Caps at or below tick_rate / max_steps need
+    # max_steps ticks or more every frame, and dropping that backlog would
+    # slow the game down, so there the limit grows with the ticks per frame
+    per_frame = -(-tick_rate // fps) if fps else 1
+    if per_frame < max_steps:
+        return max_steps
+    return per_frame + max_steps - 1
+
+
+class FixedTimestep:
+    # Accumulates real frame time and hands out whole simulation ticks.
+    # alpha is how far the renderer is between the last two ticks.
+    def __init__(self, tick_rate=SIM_HZ, max_steps=MAX_STEPS_PER_FRAME):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+        self.ticks = 0
+
+    def advance(self, frame_seconds):
+        self.accumulator += frame_seconds
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            # Drop the backlog instead of trying to catch up
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.dt
+        self.ticks += steps
+        return steps
+
+    @property
+    def alpha(self):
+        return min(1.0, self.accumulator / self.dt)
+
+
+class AdaptiveFrameCap:
+    # Chooses a render cap among the divisors of the tick rate (60, 30, 20, 15)
+    # so each frame shows a whole number of ticks. The cap drops when the work
+    # per frame doesn't fit in its budget and rises again once it easily would.
+    # max_fps starts the ladder lower (e.g. at the --fps cap). Caps that would
+    # need more than max_steps ticks a frame are never used: FixedTimestep
+    # drops that backlog, so the game would run in slow motion.
+    def __init__(self, tick_rate=SIM_HZ, min_fps=15, window=30, max_fps=None, max_steps=MAX_STEPS_PER_FRAME):
+        min_fps = max(min_fps, -(-tick_rate // max_steps))
+        max_fps = max_fps or tick_rate
+        caps = [tick_rate // n for n in range(1, tick_rate + 1) if tick_rate % n == 0]
+        self.caps = [cap for cap in caps if min_fps <= cap <= max_fps] or [min(cap for cap in caps if cap >= min_fps)]
+        self.level = 0
+        self.window = window
+        self.last_average = 0.0
+        self._work = deque(maxlen=window)
+
+    @property
+    def fps(self):
+        return self.caps[self.level]
+
+    def update(self, work_ms):
+        # work_ms is the frame time without the sleep (Clock.get_rawtime())
+        self._work.append(work_ms)
+        if len(self._work) < self.window:
+            return self.fps
+        average = self.last_average = sum(self._work) / len(self._work)
+        budget = 1000.0 / self.fps
+        if average > 0.9 * budget and self.level < len(self.caps) - 1:
+            self.level += 1
+            self._work.clear()
+        elif self.level > 0 and average < 0.5 * 1000.0 / self.caps[self.level - 1]:
+            self.level -= 1
+            self._work.clear()
+        return self.fps
@@ -0,0 +1,130 @@
+import queue
+import threading
+
+import cv2
+import pygame
+
+# Frames kept ready ahead of the render loop
+DEFAULT_BUFFER_SIZE = 8
+# Clips longer than this are never kept in memory (60x80 RGB ~ 14 KB a frame)
+MAX_CACHED_FRAMES = 900
+
+
+class VideoFrameDecoder:
+    # Decodes a looping clip on a background thread into ready-to-blit surfaces.
+    # The render loop only pops from a ring buffer, so read/cvtColor/resize and
+    # the seek back to frame 0 never run on the main thread.
+    def __init__(self, path, size, buffer_size=DEFAULT_BUFFER_SIZE, cache_loop=True, colorkey=(0, 0, 0)):
+        self.path = path
+        self.size = (int(size[0]), int(size[1]))
+        self.colorkey = colorkey
+        self.cache_loop = cache_loop
+        self._frames = queue.Queue(maxsize=buffer_size)
+        self._stop = threading.Event()
+        self._thread = None
+        # Filled once the first pass has been decoded completely
+        self._loop_frames = None
+        self._loop_index = 0
+        # Only every stride-th frame is decoded; the ones between are grabbed
+        # and never retrieved or converted (see quality.py)
+        self.stride = 1
+        self.frames_skipped = 0
+        # The file is opened on the decoder thread too; fps is a guess until then
+        self.fps = 24
+        self._capture = None
+
+    def start(self):
+        if self._thread is None and not self._stop.is_set():
+            self._thread = threading.Thread(target=self._decode_loop, name="video-decoder", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        # wait=False only tells the decoder thread to finish (it exits on its
+        # own within one put timeout), so it's safe to call mid-frame; join
+        # on shutdown
+        self._stop.set()
+        # Frees a producer blocked on a full buffer
+        while True:
+            try:
+                self._frames.get_nowait()
+            except queue.Empty:
+                break
+        if wait and self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def next_frame(self):
+        # Non-blocking: returns None when the decoder hasn't caught up yet
+        try:
+            return self._frames.get_nowait()
+        except queue.Empty:
+            pass
+        frames = self._loop_frames
+        if frames:
+            frame = frames[self._loop_index % len(frames)]
+            stride = self.stride
+            self._loop_index += stride
+            self.frames_skipped += stride - 1
+            return frame
+        return None
+
+    def _convert(self, frame):
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        frame = cv2.resize(frame, self.size)
+        surf = pygame.image.frombuffer(frame.tobytes(), frame.shape[1::-1], "RGB")
+        if self.colorkey is not None:
+            surf.set_colorkey(self.colorkey)  # Make black transparent
+        return surf
+
+    def _push(self, surf):
+        while not self._stop.is_set():
+            try:
+                self._frames.put(surf, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _decode_loop(self):
+        capture = self._capture = cv2.VideoCapture(self.path)
+        if not capture.isOpened():
+            print(f"Warning: could not open video {self.path}")
+            return
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 24
+        cached = [] if self.cache_loop else None
+        complete = True  # no frame of this pass was skipped
+        try:
+            while not self._stop.is_set():
+                ret, frame = capture.read()
+                if not ret:
+                    if cached and complete:
+                        # Whole loop is in memory, the clip is never decoded again
+                        self._loop_frames = cached
+                        return
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ret, frame = capture.read()
+                    if not ret:
+                        return
+                    # A pass with skipped frames can't be looped; try again
+                    if cached is not None:
+                        cached = []
+                        complete = True
+                stride = self.stride
+                if stride > 1:
+                    complete = False
+                    for _ in range(stride - 1):
+                        if not capture.grab():
+                            break
+                        self.frames_skipped += 1
+                surf = self._convert(frame)
+                if cached is not None:
+                    cached.append(surf)
+                    if len(cached) > MAX_CACHED_FRAMES:
+                        cached = None
+                if not self._push(surf):
+                    return
+        except Exception as e:
+            print(f"Warning: video decoding stopped: {e}")
+        finally:
+            capture.release()
@@ -0,0 +1,302 @@
+import random
+import zlib
+
+import pygame
+
+import animation
+from entities import EntityStore, SOLID, PICKUP, NO_SPRITE
+from game_input import LEFT, RIGHT, JUMP
+from level_chunks import Chunk, ChunkStreamer
+from level_gen import GROUND_Y, FreeIntervals, LevelGenerator, place_row, place_on_top
+from profiler import FrameProfiler
+
+# Game state and rules without a display, mixer or clock. A World is
+# stepped one fixed tick at a time from input bitmasks (see game_input.py);
+# PiggyGame draws one, headless.py and server.py run many of them.
+#
+# Nothing here initializes pygame: Rects work without pygame.init().
+
+VIEW_WIDTH = 800  # Width of the view chunks are streamed around
+# Sprite names the level uses; the game attaches images to their ids
+PICKUP_SPRITES = ("bush", "flower1", "rock", "bird", "flowers")
+
+# Events a tick can emit, drained by whoever presents the world
+OINK = "oink"            # pig walked along the ground
+PICKUP_EVENT = "pickup"  # a sprite pickup was collected
+VIDEO_PICKUP = "video"   # the video flower was collected
+
+
+class World:
+    def __init__(self, seed=None, view_width=VIEW_WIDTH, profiler=None, record_events=True):
+        # Stage timings (input/physics/collision); disabled unless given one
+        self.profiler = profiler or FrameProfiler()
+        self.view_width = view_width
+        # Events from the ticks since the last drain_events(); worlds nobody
+        # presents (servers, batch runs) don't keep them
+        self.record_events = record_events
+        self.events = []
+        self.ticks = 0
+        # Bumped whenever a pickup disappears (static layer caches key on it)
+        self.layout_version = 0
+
+        # Pig properties
+        self.pig_width = 80
+        self.pig_height = 80
+        self.pig_x = view_width // 2
+        self.pig_y = GROUND_Y - self.pig_height  # Start piggy on the ground
+        # Position at the previous tick, for interpolated drawing
+        self.prev_pig_pos = (self.pig_x, self.pig_y)
+        self.pig_speed = 5
+        self.facing_right = True
+        self.moving = False
+        # Everything random about the level comes from this seed, so a
+        # recording replays identically (see replay.py)
+        self.seed = seed if seed is not None else random.randrange(1 << 31)
+        self.rng = random.Random(self.seed)
+        # Generated chunks are seeded from this so they rebuild identically
+        self.level_seed = self.rng.randrange(1 << 30)
+        self.level_gen = LevelGenerator(self.level_seed, GROUND_Y)
+        # Obstacles and collectibles live in one array-backed store; sprite
+        # ids index its shared sprite table (images are attached by the game)
+        self.entities = EntityStore()
+        self.sprite_ids = {name: self.entities.register_sprite(name, None) for name in PICKUP_SPRITES}
+        # Pig animation state (idle/walk/jump/fall x facing), advanced every
+        # tick; the frames themselves are in the game's AnimationTable
+        self.pig_anim = animation.Animator()
+
+        # Obstacles (placed on the ground)
+        self.obstacles = [
+            pygame.Rect(250, GROUND_Y - 40, 100, 40),
+            pygame.Rect(450, GROUND_Y - 60, 120, 60),
+            pygame.Rect(650, GROUND_Y - 30, 80, 30)
+        ]
+        self.obstacle_sprites = []  # Collectibles on the first screen: (rect, sprite id)
+
+        # Flower1 video size (for video flower obstacle)
+        self.flower1_video_width = 60
+        self.flower1_video_height = 80
+        self.flower1_video_rect = None  # Will be set in _place_extra_obstacles
+        self.flower1_video_collected = False
+
+        self._place_extra_obstacles()
+        # Jump properties
+        self.is_jumping = False
+        self.jump_velocity = 0
+        self.jump_strength = 13
+        self.gravity = 0.7
+        # Flower properties
+        self.flower_width = 50
+        self.flower_height = 50
+        self.flower_rects = [
+            pygame.Rect(350, GROUND_Y - self.flower_height, self.flower_width, self.flower_height),
+            pygame.Rect(600, GROUND_Y - self.flower_height, self.flower_width, self.flower_height)
+        ]
+        # Flowers are collectibles like the other obstacle_sprites
+        for rect in self.flower_rects:
+            self.obstacle_sprites.append((rect, self.sprite_ids['flowers']))
+        self._build_entities()
+
+    def _place_extra_obstacles(self):
+        # Ground sprites share the free part of the first screen's ground row
+        row = FreeIntervals(50, self.view_width - 50)
+        for obs in self.obstacles:
+            row.reserve(obs.left, obs.right)
+        rock_on_ground = self.rng.random() < 0.5
+        ground = [('bush', 100, 60), ('flower1', 60, 80)]
+        if rock_on_ground:
+            ground.append(('rock', 70, 50))
+        ground.append(('video', self.flower1_video_width, self.flower1_video_height))
+        lefts = place_row(self.rng, row, [width for _, width, _ in ground])
+        for x, (kind, width, height) in zip(lefts, ground):
+            # Crowded rows just end up with fewer sprites
+            if x is None:
+                continue
+            rect = pygame.Rect(x, GROUND_Y - height, width, height)
+            if kind == 'video':
+                self.flower1_video_rect = rect
+            else:
+                self.obstacle_sprites.append((rect, self.sprite_ids[kind]))
+        # Rock on top of an obstacle (unless it went on the ground) and a bird above one
+        if not rock_on_ground:
+            self.obstacle_sprites.append((place_on_top(self.rng.choice(self.obstacles), 'rock'), self.sprite_ids['rock']))
+        self.obstacle_sprites.append((place_on_top(self.rng.choice(self.obstacles), 'bird', 30), self.sprite_ids['bird']))
+
+    def _build_entities(self):
+        # The video flower stays loaded (it has no sprite, the game draws it
+        # from the video decoder); chunks add and remove their own
+        # entities as they are streamed in and out
+        self.flower1_video_entity = None
+        if self.flower1_video_rect is not None and not self.flower1_video_collected:
+            self.flower1_video_entity = self.entities.add(self.flower1_video_rect, PICKUP, NO_SPRITE)
+        self.chunks = ChunkStreamer(self._build_chunk, self.entities)
+        self.update_chunks()
+
+    def _build_chunk(self, index):
+        # The first screen is the hand-made layout built in __init__
+        if index == 0:
+            return Chunk(0, self.obstacles, self.obstacle_sprites)
+        obstacles, pickups = self.level_gen.chunk(index)
+        return Chunk(index, obstacles, [(rect, self.sprite_ids[kind]) for rect, kind in pickups])
+
+    def view_left(self):
+        # Left edge of a view centered on the pig once it passes its start
+        return max(0, int(self.pig_x) - self.view_width // 2)
+
+    def update_chunks(self):
+        # Stream chunks in/out around the pig
+        self.chunks.update(self.view_left(), self.view_width)
+
+    def get_pig_rect(self):
+        return pygame.Rect(self.pig_x, self.pig_y, self.pig_width, self.pig_height)
+
+    def check_collision(self, rect):
+        return self.entities.any_overlap(rect, SOLID)
+
+    def get_floor_y(self, pig_rect):
+        # Returns the y-coordinate where the piggy should land (ground or top of obstacle)
+        ground_y = GROUND_Y - self.pig_height
+        # Highest obstacle top under the pig that it is standing on or above
+        top = self.entities.highest_top(pig_rect.left, pig_rect.right, pig_rect.bottom - 10)
+        if top is not None and top - self.pig_height < ground_y:
+            return top - self.pig_height
+        return ground_y
+
+    def handle_input(self, mask):
+        # Horizontal movement and jumping intent; vertical movement is
+        # update_vertical_position()
+        moved = False
+        pig_rect = self.get_pig_rect()
+        dx = 0
+        if mask & LEFT:
+            dx = -self.pig_speed
+            self.facing_right = False
+        if mask & RIGHT:
+            dx = self.pig_speed
+            self.facing_right = True
+        # Move horizontally (allow in air)
+        if dx != 0:
+            new_rect = pig_rect.move(dx, 0)
+            # The world starts at x=0 and scrolls to the right
+            if new_rect.left >= 0 and not self.check_collision(new_rect):
+                self.pig_x += dx
+                moved = True
+        # Jumping
+        if not self.is_jumping and mask & JUMP:
+            self.is_jumping = True
+            self.jump_velocity = -self.jump_strength
+        # Oink when moving (not jumping); the audio manager rate-limits it
+        if moved and not self.is_jumping:
+            self._emit(OINK)
+        # Walking along the ground (for animation)
+        self.moving = moved and not self.is_jumping
+
+    def update_vertical_position(self):
+        # Always apply gravity if not standing on ground or obstacle
+        prev_y = self.pig_y
+        pig_rect = self.get_pig_rect()
+        floor_y = self.get_floor_y(pig_rect)
+        if self.is_jumping:
+            next_y = self.pig_y + self.jump_velocity
+            self.jump_velocity += self.gravity
+            # Only obstacle tops crossed while moving downward can be landed on
+            landed = False
+            top = self.entities.highest_top(
+                pig_rect.left, pig_rect.right, prev_y + self.pig_height, next_y + self.pig_height
+            )
+            if top is not None:
+                self.pig_y = top - self.pig_height
+                self.is_jumping = False
+                self.jump_velocity = 0
+                landed = True
+            if not landed:
+                # Check for ground
+                ground_y = GROUND_Y - self.pig_height
+                if next_y >= ground_y:
+                    self.pig_y = ground_y
+                    self.is_jumping = False
+                    self.jump_velocity = 0
+                else:
+                    self.pig_y = next_y
+        else:
+            # If not jumping, check if piggy is standing on something
+            if self.pig_y < floor_y:
+                self.is_jumping = True
+                self.jump_velocity = 0
+            else:
+                self.pig_y = floor_y
+                self.is_jumping = False
+                self.jump_velocity = 0
+
+    def update_animation(self):
+        if self.is_jumping:
+            state = animation.JUMP if self.jump_velocity < 0 else animation.FALL
+        elif self.moving:
+            state = animation.WALK
+        else:
+            state = animation.IDLE
+        self.pig_anim.update(state, animation.RIGHT if self.facing_right else animation.LEFT)
+
+    def check_pickup_collisions(self, pig_rect):
+        # One batch query covers flowers, extra obstacles and the video flower
+        hits = self.entities.overlapping(pig_rect, PICKUP)
+        if not hits.size:
+            return
+        self.entities.collect(hits)
+        for eid in hits:
+            if eid == self.flower1_video_entity:
+                self.flower1_video_collected = True
+                self._emit(VIDEO_PICKUP)
+            else:
+                self.layout_version += 1
+                self._emit(PICKUP_EVENT)
+
+    def step(self, mask):
+        # One fixed simulation tick
+        profiler = self.profiler
+        self.prev_pig_pos = (self.pig_x, self.pig_y)
+        with profiler.stage("input"):
+            self.handle_input(mask)
+        with profiler.stage("physics"):
+            # Always update vertical position (gravity/falling)
+            self.update_vertical_position()
+        with profiler.stage("collision"):
+            # Check for flower, extra obstacle and flower1 video collisions
+            self.check_pickup_collisions(self.get_pig_rect())
+        self.update_animation()
+        self.update_chunks()
+        self.ticks += 1
+
+    def run(self, inputs):
+        for mask in inputs:
+            self.step(mask)
+        return self.ticks
+
+    def _emit(self, event):
+        if self.record_events:
+            self.events.append(event)
+
+    def drain_events(self):
+        events = self.events
+        self.events = []
+        return events
+
+    def collected(self):
+        return self.chunks.collected_count()
+
+    def state(self):
+        # Plain-data snapshot (for servers, logs and tests)
+        return {
+            "tick": self.ticks,
+            "pig_x": self.pig_x,
+            "pig_y": self.pig_y,
+            "jumping": self.is_jumping,
+            "facing_right": self.facing_right,
+            "collected": self.collected(),
+            "video_collected": self.flower1_video_collected,
+        }
+
+    def state_checksum(self):
+        # Fingerprint of the simulation state a replay must reproduce exactly
+        state = (self.pig_x, self.pig_y, self.jump_velocity, self.is_jumping, self.facing_right,
+                 self.chunks.collected_count(), self.flower1_video_collected)
+        return zlib.crc32(repr(state).encode("ascii"))